@@ -2,29 +2,29 @@ import discord
 from discord.ext import commands
 import aiosqlite
 import os
-import asyncio
-import re
-from typing import Final, Optional, Set
-import aiohttp
-from urllib.parse import urlparse
+import hashlib
+from collections import OrderedDict
+from typing import Final, Optional
 from pathlib import Path
 
-
-INVITE_PATTERNS: Final[Set[str]] = {
-    "discord.gg/",
-    "discordapp.com/invite/",
-    "discord.com/invite/"
-}
-
-URL_SHORTENERS: Final[Set[str]] = {
-    "x.gd", "bit.ly", "tinyurl.com",
-    "goo.gl", "is.gd", "ow.ly",
-    "buff.ly", "00m.in"
-}
+from module.invite_detector import normalize, scan
+from module.moderation import PurgeBatcher
+from module.url_resolver import ShortUrlResolver
 
 ADMIN_ONLY_MESSAGE: Final[str] = "このコマンドはサーバー管理者のみ実行可能です。"
 GUILD_ONLY_MESSAGE: Final[str] = "このコマンドはサーバー内でのみ使用可能です。"
 INVITE_WARNING: Final[str] = "Discord招待リンクは禁止です。メッセージは削除されました。"
+SCANNED_CACHE_SIZE: Final[int] = 10_000  # 検査済みメッセージのハッシュを覚えておく件数
+
+def scan_target(message: discord.Message) -> str:
+    """検査対象の文字列(本文と埋め込みのタイトル・説明)"""
+    parts = [message.content]
+    for embed in message.embeds:
+        if embed.title:
+            parts.append(embed.title)
+        if embed.description:
+            parts.append(embed.description)
+    return "\n".join(parts)
 
 class AntiInvite(commands.Cog):
     """招待リンク自動削除機能"""
@@ -37,12 +37,12 @@ class AntiInvite(commands.Cog):
         self.db_path = self.data_dir / "anti_invite.db"
         self.db_exempt_path = self.data_dir / "anti_invite_exempt.db"
 
-        self._session: Optional[aiohttp.ClientSession] = None
-        self._url_cache: Set[str] = set()  # キャッシュによるパフォーマンス向上
+        self.resolver = ShortUrlResolver(self.db_path)
+        self.purger = PurgeBatcher(INVITE_WARNING)
+        # message_id -> 最後に検査した内容のハッシュ
+        self._scanned: "OrderedDict[int, bytes]" = OrderedDict()
 
     async def cog_load(self) -> None:
-        self._session = aiohttp.ClientSession()
-
         # メインDB
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute("""
@@ -64,10 +64,11 @@ class AntiInvite(commands.Cog):
             """)
             await db.commit()
 
+        await self.resolver.initialize()
+
     async def cog_unload(self) -> None:
-        if self._session:
-            await self._session.close()
-            self._session = None
+        await self.purger.close()
+        await self.resolver.close()
 
     async def set_setting(self, guild_id: int, enabled: bool) -> None:
         """サーバーごとの設定を保存"""
@@ -89,56 +90,15 @@ class AntiInvite(commands.Cog):
                 return bool(row[0]) if row else False
 
     async def contains_invite(self, content: str) -> bool:
-        # 直接の招待リンクチェック
-        if any(pattern in content.lower() for pattern in INVITE_PATTERNS):
+        # 直接の招待リンクと短縮URLを正規化した文字列から1回で検出
+        result = scan(content)
+        if result.has_invite:
             return True
-
-        # URLの抽出
-        urls = re.findall(r"(https?://\S+)", content)
-        if not urls:
+        if not result.short_urls:
             return False
 
-        if not self._session:
-            self._session = aiohttp.ClientSession()
-
-        for url in urls:
-            try:
-                parsed = urlparse(url)
-                if not parsed.hostname:
-                    continue
-
-                hostname = parsed.hostname.lower()
-                if hostname not in URL_SHORTENERS:
-                    continue
-
-                # キャッシュチェック
-                if url in self._url_cache:
-                    return True
-
-                # 短縮URLの展開
-                try:
-                    async with self._session.head(
-                        url,
-                        allow_redirects=True,
-                        timeout=5
-                    ) as response:
-                        final_url = str(response.url)
-                except Exception:
-                    async with self._session.get(
-                        url,
-                        allow_redirects=True,
-                        timeout=5
-                    ) as response:
-                        final_url = str(response.url)
-
-                if any(pattern in final_url.lower() for pattern in INVITE_PATTERNS):
-                    self._url_cache.add(url)  # キャッシュに追加
-                    return True
-
-            except Exception:
-                continue
-
-        return False
+        # 短縮URLはまとめて並行に展開する(結果はTTL付きでDBにも保存される)
+        return await self.resolver.any_invite(result.short_urls)
 
     @discord.app_commands.command(
         name="anti-invite",
@@ -227,8 +187,30 @@ class AntiInvite(commands.Cog):
         embed = discord.Embed(title=title, description=desc, color=discord.Color.green())
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    def _is_unchanged(self, message: discord.Message, text: str) -> bool:
+        """前回検査したときから内容が変わっていなければ True(ハッシュは記録する)"""
+        digest = hashlib.blake2b(normalize(text).encode(), digest_size=8).digest()
+        if self._scanned.get(message.id) == digest:
+            self._scanned.move_to_end(message.id)
+            return True
+        self._scanned[message.id] = digest
+        self._scanned.move_to_end(message.id)
+        if len(self._scanned) > SCANNED_CACHE_SIZE:
+            self._scanned.popitem(last=False)
+        return False
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
+        await self._check_message(message)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        # 埋め込みの展開などで頻繁に届くが、内容が変わっていなければ検査しない
+        if payload.guild_id is None:
+            return
+        await self._check_message(payload.message)
+
+    async def _check_message(self, message: discord.Message) -> None:
         if not message.guild or message.author.bot:
             return
 
@@ -245,14 +227,14 @@ class AntiInvite(commands.Cog):
         if message.channel.id in whitelist_channels:
             return
 
-        if await self.contains_invite(message.content):
-            try:
-                await message.delete()
-                warning = await message.channel.send(INVITE_WARNING)
-                await asyncio.sleep(5)
-                await warning.delete()
-            except (discord.errors.Forbidden, Exception):
-                pass
+        # 有効なサーバーのメッセージだけを記録し、無効なサーバーで履歴を押し流さない
+        text = scan_target(message)
+        if self._is_unchanged(message, text):
+            return
+
+        if await self.contains_invite(text):
+            # 連投に備えてチャンネルごとにまとめて削除し、警告も1件にする
+            self.purger.submit(message)
 
 
 async def setup(bot: commands.Bot) -> None:
@@ -0,0 +1,224 @@
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Final, List, Optional, Set
+import logging
+
+import aiosqlite
+import discord
+from discord.ext import commands
+
+from module.invite_detector import normalize
+from module.moderation import PurgeBatcher
+
+
+DB_PATH: Final[Path] = Path("data/anti_spam.db")
+
+DUPLICATE_WINDOW: Final[float] = 60.0  # seconds
+# 同じ人が同じ内容をこの数のチャンネルに投稿したら重複スパムとみなす
+DUPLICATE_CHANNELS: Final[int] = 3
+MIN_CONTENT_LENGTH: Final[int] = 8  # これより短い本文だけのメッセージは対象外
+MAX_FINGERPRINTS: Final[int] = 5000  # サーバーごと
+MAX_TRACKED_MESSAGES: Final[int] = 20  # 指紋ごと、検知時にまとめて削除する分
+
+ADMIN_ONLY_MESSAGE: Final[str] = "このコマンドはサーバー管理者のみ実行可能です。"
+GUILD_ONLY_MESSAGE: Final[str] = "このコマンドはサーバー内でのみ使用可能です。"
+SPAM_WARNING: Final[str] = "同じ人による同じ内容のメッセージが複数のチャンネルに投稿されたため削除しました。"
+
+logger = logging.getLogger(__name__)
+
+def fingerprint(message: discord.Message) -> Optional[int]:
+    """送信者・正規化した本文・添付ファイルの情報から指紋を作る(対象外なら None)
+
+    同じ人が複数のチャンネルに投稿したときだけ一致させ、別々の人の
+    同じ挨拶などを巻き込まないよう送信者も含める。
+    """
+    content = " ".join(normalize(message.content).casefold().split())
+    if not message.attachments and len(content) < MIN_CONTENT_LENGTH:
+        return None
+    digest = hashlib.blake2b(f"{message.author.id}\0{content}".encode(), digest_size=8)
+    for attachment in message.attachments:
+        digest.update(
+            f"\0{attachment.filename.casefold()}:{attachment.size}:{attachment.content_type}".encode()
+        )
+    return int.from_bytes(digest.digest(), "big")
+
+class FingerprintEntry:
+    """1つの指紋を最後に見た時刻と、投稿されたチャンネル・メッセージ"""
+
+    __slots__ = ("last_seen", "channels", "messages", "flagged")
+
+    def __init__(self) -> None:
+        self.last_seen = 0.0
+        self.channels: Set[int] = set()
+        self.messages: List[discord.Message] = []
+        self.flagged = False
+
+class FingerprintIndex:
+    """サーバーごとの直近 DUPLICATE_WINDOW 秒の指紋
+
+    最後に見た順に並べ、古いものを先頭から捨てるので1件あたりの処理は償却O(1)。
+    """
+
+    def __init__(self) -> None:
+        self.entries: "OrderedDict[int, FingerprintEntry]" = OrderedDict()
+
+    def observe(self, key: int, message: discord.Message, now: float) -> FingerprintEntry:
+        self._expire(now)
+        if (entry := self.entries.get(key)) is None:
+            entry = self.entries[key] = FingerprintEntry()
+            if len(self.entries) > MAX_FINGERPRINTS:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        entry.last_seen = now
+        entry.channels.add(message.channel.id)
+        if not entry.flagged and len(entry.messages) < MAX_TRACKED_MESSAGES:
+            entry.messages.append(message)
+        return entry
+
+    def _expire(self, now: float) -> None:
+        while self.entries:
+            entry = next(iter(self.entries.values()))
+            if now - entry.last_seen <= DUPLICATE_WINDOW:
+                break
+            self.entries.popitem(last=False)
+
+    def memory_bytes(self) -> int:
+        """おおよその使用メモリ(メッセージ本体は除く)"""
+        size = sys.getsizeof(self.entries)
+        for entry in self.entries.values():
+            size += (
+                sys.getsizeof(entry)
+                + sys.getsizeof(entry.channels)
+                + sys.getsizeof(entry.messages)
+            )
+        return size
+
+class AntiSpam(commands.Cog):
+    """同じ人による複数チャンネルへの同一内容の連投を削除する"""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.enabled: Set[int] = set()
+        self._indexes: Dict[int, FingerprintIndex] = {}
+        self.purger = PurgeBatcher(SPAM_WARNING)
+        self.removed = 0
+
+    async def cog_load(self) -> None:
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS settings (
+                    guild_id INTEGER PRIMARY KEY
+                )
+            """)
+            await db.commit()
+            async with db.execute("SELECT guild_id FROM settings") as cursor:
+                self.enabled = {row[0] async for row in cursor}
+
+    async def cog_unload(self) -> None:
+        await self.purger.close()
+
+    async def set_setting(self, guild_id: int, enabled: bool) -> None:
+        """サーバーごとの設定を保存"""
+        async with aiosqlite.connect(DB_PATH) as db:
+            if enabled:
+                await db.execute(
+                    "INSERT OR IGNORE INTO settings (guild_id) VALUES (?)",
+                    (guild_id,)
+                )
+            else:
+                await db.execute("DELETE FROM settings WHERE guild_id = ?", (guild_id,))
+            await db.commit()
+
+        if enabled:
+            self.enabled.add(guild_id)
+        else:
+            self.enabled.discard(guild_id)
+            self._indexes.pop(guild_id, None)
+
+    def get_debug_info(self) -> Dict[str, str]:
+        """管理者向けデバッグ表示用の統計"""
+        fingerprints = sum(len(index.entries) for index in self._indexes.values())
+        messages = sum(
+            len(entry.messages)
+            for index in self._indexes.values()
+            for entry in index.entries.values()
+        )
+        memory = sys.getsizeof(self._indexes) + sum(
+            index.memory_bytes() for index in self._indexes.values()
+        )
+        return {
+            "Anti-Spam": (
+                f"{len(self.enabled)} guilds enabled, "
+                f"{fingerprints} fingerprints, {messages} tracked messages, "
+                f"~{memory / 1024:.1f} KiB, {self.removed} removed"
+            )
+        }
+
+    @discord.app_commands.command(
+        name="anti-spam",
+        description="複数チャンネルへの同じ内容の連投の自動削除を設定します。（デフォルトはdisable）"
+    )
+    @discord.app_commands.describe(action="設定する値（enable または disable）")
+    @discord.app_commands.choices(action=[
+        discord.app_commands.Choice(name="enable", value="enable"),
+        discord.app_commands.Choice(name="disable", value="disable")
+    ])
+    async def anti_spam(self, interaction: discord.Interaction, action: str) -> None:
+        """重複スパム自動削除の有効/無効を設定"""
+        if not interaction.guild:
+            await interaction.response.send_message(GUILD_ONLY_MESSAGE, ephemeral=True)
+            return
+
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message(ADMIN_ONLY_MESSAGE, ephemeral=True)
+            return
+
+        enabled = action.lower() == "enable"
+        await self.set_setting(interaction.guild.id, enabled)
+
+        embed = discord.Embed(
+            title="Anti-Spam設定",
+            description=f"このサーバーでの重複スパム自動削除は **{'有効' if enabled else '無効'}** になりました。",
+            color=discord.Color.green()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        if message.author.bot or not message.guild:
+            return
+        if message.guild.id not in self.enabled:
+            return
+        # モデレーターの複数チャンネルへのお知らせは対象外
+        if message.channel.permissions_for(message.author).manage_messages:
+            return
+        if (key := fingerprint(message)) is None:
+            return
+
+        if (index := self._indexes.get(message.guild.id)) is None:
+            index = self._indexes[message.guild.id] = FingerprintIndex()
+        entry = index.observe(key, message, time.monotonic())
+
+        if entry.flagged:
+            self.purger.submit(message)
+            self.removed += 1
+        elif len(entry.channels) >= DUPLICATE_CHANNELS:
+            # 検知した時点で、それまでの同じ内容の投稿もまとめて削除する
+            entry.flagged = True
+            logger.info(
+                "Duplicate spam in guild %s across %d channels",
+                message.guild.id, len(entry.channels)
+            )
+            for tracked in entry.messages:
+                self.purger.submit(tracked)
+            self.removed += len(entry.messages)
+            entry.messages.clear()
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(AntiSpam(bot))
@@ -179,6 +179,8 @@ class ServerBoard(commands.Cog):
     async def setup_database(self) -> None:
         try:
             async with aiosqlite.connect(DB_PATH) as conn:
+                # Web APIが読み取り中でも書き込めるようにWALにする(DBファイルに保存される)
+                await conn.execute("PRAGMA journal_mode=WAL")
                 await conn.execute("""
                     CREATE TABLE IF NOT EXISTS servers (
                         server_id INTEGER PRIMARY KEY,
@@ -191,6 +193,64 @@ class ServerBoard(commands.Cog):
                         invite_url TEXT
                     )
                 """)
+                # 掲示板の表示順(Web APIのページ分割)に合わせたインデックス
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_servers_board_order
+                    ON servers (last_up_time DESC, registered_at DESC, server_id DESC)
+                """)
+                # Web APIの検索用の全文検索索引(日本語でも部分一致できるようtrigram)
+                async with conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='servers_fts'"
+                ) as cursor:
+                    fts_exists = await cursor.fetchone() is not None
+                await conn.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS servers_fts USING fts5(
+                        server_name, description,
+                        content='servers', content_rowid='server_id',
+                        tokenize='trigram'
+                    );
+                    CREATE TRIGGER IF NOT EXISTS servers_fts_insert AFTER INSERT ON servers
+                    BEGIN
+                        INSERT INTO servers_fts (rowid, server_name, description)
+                        VALUES (new.server_id, new.server_name, new.description);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS servers_fts_delete AFTER DELETE ON servers
+                    BEGIN
+                        INSERT INTO servers_fts (servers_fts, rowid, server_name, description)
+                        VALUES ('delete', old.server_id, old.server_name, old.description);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS servers_fts_update
+                    AFTER UPDATE OF server_name, description ON servers
+                    BEGIN
+                        INSERT INTO servers_fts (servers_fts, rowid, server_name, description)
+                        VALUES ('delete', old.server_id, old.server_name, old.description);
+                        INSERT INTO servers_fts (rowid, server_name, description)
+                        VALUES (new.server_id, new.server_name, new.description);
+                    END;
+                """)
+                if not fts_exists:
+                    # 既に登録されているサーバーを索引に入れる
+                    await conn.execute("INSERT INTO servers_fts (servers_fts) VALUES ('rebuild')")
+                # Web APIが一覧のキャッシュを使い回せるよう、serversの変更回数を数える
+                await conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS board_meta (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        change_count INTEGER NOT NULL
+                    );
+                    INSERT OR IGNORE INTO board_meta (id, change_count) VALUES (1, 0);
+                    CREATE TRIGGER IF NOT EXISTS servers_count_insert AFTER INSERT ON servers
+                    BEGIN
+                        UPDATE board_meta SET change_count = change_count + 1 WHERE id = 1;
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS servers_count_update AFTER UPDATE ON servers
+                    BEGIN
+                        UPDATE board_meta SET change_count = change_count + 1 WHERE id = 1;
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS servers_count_delete AFTER DELETE ON servers
+                    BEGIN
+                        UPDATE board_meta SET change_count = change_count + 1 WHERE id = 1;
+                    END;
+                """)
                 await conn.commit()
 
             async with aiosqlite.connect(UP_DB_PATH) as conn:
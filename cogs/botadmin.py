@@ -149,11 +149,22 @@ class BotAdmin(commands.Cog):
             f"{shard_info}"
         )
 
-        return discord.Embed(
+        embed = discord.Embed(
             title="デバッグ情報",
             description=debug_info,
             color=EMBED_COLORS["success"]
         )
+        # get_debug_info を持つCogの統計(使用メモリなど)を追加
+        for cog in self.bot.cogs.values():
+            get_debug_info = getattr(cog, "get_debug_info", None)
+            if get_debug_info is None:
+                continue
+            try:
+                for name, value in get_debug_info().items():
+                    embed.add_field(name=name, value=value, inline=False)
+            except Exception as e:
+                logger.error("Failed to collect debug info from %s: %s", cog.qualified_name, e)
+        return embed
 
     @app_commands.command(
         name="botadmin",
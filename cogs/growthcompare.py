@@ -0,0 +1,275 @@
+import asyncio
+from typing import Final, List, Optional, Tuple
+import logging
+
+import discord
+from discord.ext import commands
+
+from module.chart import ChartRequest, get_renderer
+from module.forecast import (
+    ARIMA_FORECAST_DAYS,
+    GRAPH_SETTINGS,
+    ArimaPredictor,
+    Forecaster,
+    GrowthPredictor,
+    ProphetPredictor,
+    fit_timed
+)
+from module.growth_store import GrowthSeries, get_store
+from module.progress import ProgressReporter
+from module.workers import run_in_worker
+
+
+GRAPH_SIZE: Final[Tuple[int, int]] = (12, 8)
+GRAPH_FORMAT: Final[str] = "png"
+GRAPH_FILENAME: Final[str] = f"growth_compare.{GRAPH_FORMAT}"
+MIN_DATA_POINTS: Final[int] = 2
+
+MODEL_COLORS: Final[dict] = {
+    "Polynomial": "red",
+    "ARIMA": "orange",
+    "Prophet": "purple"
+}
+
+ERROR_MESSAGES: Final[dict] = {
+    "insufficient_data": "予測を行うためのデータが不足しています。",
+    "all_failed": "すべてのモデルで予測に失敗しました。",
+    "unexpected": "エラーが発生しました: {}"
+}
+
+FOOTER_TEXT: Final[str] = (
+    "この予測は統計モデルに基づくものであり、"
+    "実際の結果を保証するものではありません。"
+)
+
+logger = logging.getLogger(__name__)
+
+class ModelRun:
+    """1つのモデルの実行結果"""
+
+    def __init__(self, forecaster: Forecaster) -> None:
+        self.forecaster = forecaster
+        self.elapsed: Optional[float] = None
+        self.error: Optional[Exception] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None and self.elapsed is not None
+
+class GrowthCompare(commands.Cog):
+    """複数の成長予測モデルを同時に実行して比較"""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.store = get_store()
+        self.renderer = get_renderer()
+
+    async def _run_models(
+        self,
+        series: GrowthSeries,
+        target: int,
+        progress: ProgressReporter
+    ) -> List[ModelRun]:
+        """全モデルをワーカープールで並行に実行"""
+        runs = [
+            ModelRun(GrowthPredictor(series, target)),
+            ModelRun(ArimaPredictor(series, target)),
+            ModelRun(ProphetPredictor(series, target))
+        ]
+
+        def reporter(name: str):
+            def report(stage: str, detail: Optional[str] = None) -> None:
+                progress.update(stage, f"{name} {detail}" if detail else name)
+            return report
+
+        results = await asyncio.gather(
+            *(
+                run_in_worker(fit_timed, run.forecaster, reporter(run.forecaster.name))
+                for run in runs
+            ),
+            return_exceptions=True
+        )
+
+        for run, result in zip(runs, results):
+            if isinstance(result, Exception):
+                logger.warning(
+                    "Model %s failed in growth-compare: %s",
+                    run.forecaster.name, result
+                )
+                run.error = result
+            else:
+                run.elapsed = result
+        return runs
+
+    def _create_chart(
+        self,
+        series: GrowthSeries,
+        target: int,
+        runs: List[ModelRun]
+    ) -> ChartRequest:
+        """全モデルの予測線を重ねたグラフを作成"""
+        chart = ChartRequest(
+            "Server Growth Prediction (Model Comparison)",
+            size=GRAPH_SIZE,
+            image_format=GRAPH_FORMAT,
+            fontsize=GRAPH_SETTINGS["fontsize"],
+            grid_alpha=GRAPH_SETTINGS["alpha"]
+        )
+        chart.scatter(
+            series.ordinals,
+            series.counts,
+            color=GRAPH_SETTINGS["colors"]["actual"],
+            label="Actual Data",
+            alpha=GRAPH_SETTINGS["alpha"]
+        )
+
+        last_day = series.start_ordinal + len(series) - 1
+        for run in runs:
+            if not run.succeeded:
+                continue
+            forecaster = run.forecaster
+            color = MODEL_COLORS.get(forecaster.name)
+            if target_date := forecaster.predict_target_date():
+                curve_x, curve_y = forecaster.chart_curve(target_date)
+                chart.vline(
+                    target_date,
+                    color=color,
+                    linestyle=":",
+                    linewidth=1
+                )
+            else:
+                # 到達しない場合は表示範囲を揃える
+                curve_x, curve_y = forecaster.forecast_x, forecaster.forecast_y
+                visible = curve_x <= last_day + ARIMA_FORECAST_DAYS
+                curve_x, curve_y = curve_x[visible], curve_y[visible]
+
+            chart.line(
+                curve_x,
+                curve_y,
+                color=color,
+                label=forecaster.name,
+                linewidth=GRAPH_SETTINGS["linewidth"]
+            )
+
+        chart.hline(
+            target,
+            color=GRAPH_SETTINGS["colors"]["target"],
+            linestyle="--",
+            label=f"Target: {target}",
+            linewidth=GRAPH_SETTINGS["linewidth"]
+        )
+        return chart
+
+    def _create_table(self, runs: List[ModelRun]) -> str:
+        """モデルごとの予測日・精度・計算時間の表"""
+        rows = [("Model", "Date", "R^2", "Time")]
+        for run in runs:
+            forecaster = run.forecaster
+            if not run.succeeded:
+                rows.append((forecaster.name, "failed", "-", "-"))
+                continue
+            target_date = forecaster.predict_target_date()
+            rows.append((
+                forecaster.name,
+                str(target_date.date()) if target_date else "not reached",
+                f"{forecaster.get_model_score():.3f}",
+                f"{run.elapsed:.2f}s"
+            ))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = [
+            "  ".join(value.ljust(width) for value, width in zip(row, widths))
+            for row in rows
+        ]
+        return "```\n" + "\n".join(lines) + "\n```"
+
+    def _create_embed(
+        self,
+        target: int,
+        series: GrowthSeries,
+        runs: List[ModelRun],
+        show_graph: bool
+    ) -> discord.Embed:
+        embed = discord.Embed(
+            title="Server Growth Prediction (Model Comparison)",
+            description=f"{target}人に達する予測日の比較\n{self._create_table(runs)}",
+            color=discord.Color.blue()
+        )
+
+        if show_graph:
+            embed.set_image(url=f"attachment://{GRAPH_FILENAME}")
+
+        dates = [
+            d for run in runs
+            if run.succeeded and (d := run.forecaster.predict_target_date())
+        ]
+        fields = {
+            "データポイント数": str(len(series)),
+            "記録開始日": series.first_date.strftime("%Y-%m-%d"),
+            "最新の記録日": series.last_date.strftime("%Y-%m-%d"),
+            "予測日の幅": (
+                f"{(max(dates) - min(dates)).days}日" if len(dates) > 1 else "-"
+            )
+        }
+        for name, value in fields.items():
+            embed.add_field(name=name, value=value, inline=True)
+
+        embed.set_footer(text=FOOTER_TEXT)
+        return embed
+
+    @discord.app_commands.command(
+        name="growth-compare",
+        description="3つの予測モデルでサーバーの成長を同時に予測し、比較します。"
+    )
+    @discord.app_commands.describe(
+        target="目標とするメンバー数",
+        show_graph="グラフを表示するかどうか"
+    )
+    async def growth_compare(
+        self,
+        interaction: discord.Interaction,
+        target: int,
+        show_graph: bool = True
+    ) -> None:
+        try:
+            await interaction.response.defer(thinking=True)
+
+            async with ProgressReporter(interaction) as progress:
+                # 日次のメンバー数を一度だけ取得し、全モデルで共有
+                progress.update("binning")
+                series = await self.store.get_series(interaction.guild)
+
+                if len(series) < MIN_DATA_POINTS:
+                    await progress.send(
+                        ERROR_MESSAGES["insufficient_data"]
+                    )
+                    return
+
+                runs = await self._run_models(series, target, progress)
+                if not any(run.succeeded for run in runs):
+                    await progress.send(ERROR_MESSAGES["all_failed"])
+                    return
+
+                embed = self._create_embed(target, series, runs, show_graph)
+
+                if show_graph:
+                    progress.update("rendering")
+                    file = discord.File(
+                        await self.renderer.render(
+                            self._create_chart(series, target, runs)
+                        ),
+                        filename=GRAPH_FILENAME
+                    )
+                    await progress.send(embed=embed, file=file)
+                else:
+                    await progress.send(embed=embed)
+
+        except Exception as e:
+            logger.error("Error in growth-compare command: %s", e, exc_info=True)
+            await interaction.followup.send(
+                ERROR_MESSAGES["unexpected"].format(str(e))
+            )
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(GrowthCompare(bot))
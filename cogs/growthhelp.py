@@ -45,6 +45,19 @@ COMMAND_INFO: Final[Dict[str, dict]] = {
             "target: 目標とするメンバー数",
             "show_graph: グラフを表示するかどうか（デフォルト: True）"
         ]
+    },
+    "growth_compare": {
+        "name": "/growth-compare",
+        "description": "3つのモデルで同時に予測し、結果を比較します。",
+        "features": [
+            "各モデルの予測線を1つのグラフに重ねて表示します。",
+            "予測日・精度・計算時間を表で比較できます。",
+            "どのモデルを使うか迷ったときに便利です。"
+        ],
+        "parameters": [
+            "target: 目標とするメンバー数",
+            "show_graph: グラフを表示するかどうか（デフォルト: True）"
+        ]
     }
 }
 
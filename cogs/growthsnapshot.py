@@ -0,0 +1,72 @@
+from datetime import time, timezone
+from typing import Final
+import logging
+
+import discord
+from discord.ext import commands, tasks
+
+from module.growth_store import get_store
+
+
+FLUSH_INTERVAL: Final[int] = 5  # minutes
+SNAPSHOT_TIME: Final[time] = time(hour=23, minute=55, tzinfo=timezone.utc)
+
+logger = logging.getLogger(__name__)
+
+class GrowthSnapshot(commands.Cog):
+    """サーバーのメンバー数の推移を日次で記録"""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.store = get_store()
+
+    async def cog_load(self) -> None:
+        await self.store.init_db()
+        self.flush_events.start()
+        self.daily_snapshot.start()
+
+    async def cog_unload(self) -> None:
+        self.flush_events.cancel()
+        self.daily_snapshot.cancel()
+        await self.store.flush()
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member) -> None:
+        self.store.record_join(member.guild)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member) -> None:
+        self.store.record_leave(member.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        """新規サーバーの履歴を補完"""
+        try:
+            await self.store.ensure_backfilled(guild)
+        except Exception as e:
+            logger.error("Error backfilling guild %s: %s", guild.id, e, exc_info=True)
+
+    @tasks.loop(minutes=FLUSH_INTERVAL)
+    async def flush_events(self) -> None:
+        try:
+            await self.store.flush()
+        except Exception as e:
+            logger.error("Error flushing growth events: %s", e, exc_info=True)
+
+    @tasks.loop(time=SNAPSHOT_TIME)
+    async def daily_snapshot(self) -> None:
+        """全サーバーのメンバー数を記録"""
+        try:
+            await self.store.ensure_all_backfilled(self.bot.guilds)
+            await self.store.snapshot(self.bot.guilds)
+            logger.info("Recorded growth snapshot for %s guilds", len(self.bot.guilds))
+        except Exception as e:
+            logger.error("Error recording growth snapshot: %s", e, exc_info=True)
+
+    @daily_snapshot.before_loop
+    async def before_daily_snapshot(self) -> None:
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(GrowthSnapshot(bot))
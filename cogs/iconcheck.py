@@ -1,18 +1,36 @@
 import discord
 from discord.ext import commands
 from discord.ui import View
+from collections import deque
 from datetime import datetime, timezone, timedelta
 import aiosqlite
 from pathlib import Path
-from typing import Final, Optional
+import time
+from typing import Deque, Dict, Final, List, Optional, Set, Tuple
 import logging
 
+from module.moderation import PurgeBatcher
+
 
 JST: Final[timezone] = timezone(timedelta(hours=9))
 DB_PATH: Final[Path] = Path("data/anticheat.db")
 BUTTON_TIMEOUT: Final[int] = 60
 WARNING_DELETE_DELAY: Final[int] = 5
 
+# JOIN_BURST_COUNT 人が JOIN_BURST_WINDOW 秒以内に参加したらレイドとみなす
+JOIN_BURST_COUNT: Final[int] = 10
+JOIN_BURST_WINDOW: Final[float] = 30.0
+# 新規メンバーのメッセージが MESSAGE_BURST_WINDOW 秒以内に MESSAGE_BURST_COUNT 件
+MESSAGE_BURST_COUNT: Final[int] = 15
+MESSAGE_BURST_WINDOW: Final[float] = 10.0
+# レイド検知時にまとめて削除するため保持しておく新規メンバーのメッセージ数
+RECENT_MESSAGE_BUFFER: Final[int] = 100
+# 保持するのはバーストの判定範囲内のものだけ(古い正当なメッセージは消さない)
+RECENT_MESSAGE_WINDOW: Final[float] = max(JOIN_BURST_WINDOW, MESSAGE_BURST_WINDOW)
+RAID_DURATION: Final[float] = 600.0  # seconds, 最後のバーストからレイドモードを続ける時間
+NEWCOMER_JOIN_AGE: Final[timedelta] = timedelta(minutes=10)
+NEWCOMER_ACCOUNT_AGE: Final[timedelta] = timedelta(days=7)
+
 EMBED_COLORS: Final[dict] = {
     "error": discord.Color.red(),
     "warning": discord.Color.orange(),
@@ -34,9 +52,20 @@ SUCCESS_MESSAGES: Final[dict] = {
     "disabled": "荒らし対策を無効にしました。"
 }
 
+RAID_WARNING: Final[str] = (
+    "荒らしを検知したため、新しいアカウントからのメッセージを一時的に制限しています。"
+)
+RAID_NOTICE: Final[str] = (
+    "短時間に参加やメッセージが集中したため、レイドモードに切り替えました。\n"
+    "新しいアカウントと最近参加したメンバーのメッセージは削除されます。"
+    "しばらく落ち着くと自動的に解除されます。"
+)
+
 FEATURE_DESCRIPTION: Final[str] = (
     "この機能は、デフォルトアバターかつ本日作成されたアカウントによる"
     "メッセージ送信を制限することで、荒らし対策をします。\n"
+    "参加やメッセージが短時間に集中した場合は、一時的に新しいアカウントの"
+    "メッセージをまとめて削除するレイドモードに切り替わります。\n"
     "登録ボタンを押すことで、荒らし対策を有効にします。"
 )
 
@@ -58,13 +87,11 @@ class AntiRaidDatabase:
             await db.commit()
 
     @staticmethod
-    async def is_enabled(guild_id: int) -> bool:
+    async def load_enabled() -> Set[int]:
+        """有効なサーバーの一覧を取得"""
         async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute(
-                "SELECT 1 FROM enabled_servers WHERE guild_id = ?",
-                (guild_id,)
-            ) as cursor:
-                return await cursor.fetchone() is not None
+            async with db.execute("SELECT guild_id FROM enabled_servers") as cursor:
+                return {row[0] async for row in cursor}
 
     @staticmethod
     async def enable(guild_id: int) -> None:
@@ -86,12 +113,125 @@ class AntiRaidDatabase:
             )
             await db.commit()
 
+def is_icon_violation(member: discord.abc.User, now: datetime) -> bool:
+    """デフォルトアバターかつ本日作成されたアカウントか"""
+    created_at_utc = member.created_at.replace(tzinfo=timezone.utc)
+    return member.avatar is None and created_at_utc.date() == now.date()
+
+def is_newcomer(member: discord.abc.User, now: datetime) -> bool:
+    """作成されたばかりのアカウント、または参加したばかりのメンバーか"""
+    created_at_utc = member.created_at.replace(tzinfo=timezone.utc)
+    if now - created_at_utc < NEWCOMER_ACCOUNT_AGE:
+        return True
+    joined_at = getattr(member, "joined_at", None)
+    return joined_at is not None and now - joined_at < NEWCOMER_JOIN_AGE
+
+class GuildRaidState:
+    """サーバーごとの直近の参加・メッセージの記録"""
+
+    __slots__ = ("joins", "messages", "recent", "raid_until")
+
+    def __init__(self) -> None:
+        # 固定長のリングバッファ。満杯のとき先頭と末尾の時刻差がバーストの判定になる
+        self.joins: Deque[float] = deque(maxlen=JOIN_BURST_COUNT)
+        self.messages: Deque[float] = deque(maxlen=MESSAGE_BURST_COUNT)
+        # (記録した時刻, メッセージ)
+        self.recent: Deque[Tuple[float, discord.Message]] = deque(maxlen=RECENT_MESSAGE_BUFFER)
+        self.raid_until = 0.0
+
+class RaidDetector:
+    """参加・メッセージの集中を1件あたりO(1)で検知し、レイドモードを管理する"""
+
+    def __init__(self) -> None:
+        self.enabled: Set[int] = set()
+        self._guilds: Dict[int, GuildRaidState] = {}
+
+    def enable(self, guild_id: int) -> None:
+        self.enabled.add(guild_id)
+
+    def disable(self, guild_id: int) -> None:
+        self.enabled.discard(guild_id)
+        self._guilds.pop(guild_id, None)
+
+    def _state(self, guild_id: int) -> GuildRaidState:
+        if (state := self._guilds.get(guild_id)) is None:
+            state = self._guilds[guild_id] = GuildRaidState()
+        return state
+
+    @staticmethod
+    def _is_burst(window: Deque[float], now: float, span: float) -> bool:
+        window.append(now)
+        return len(window) == window.maxlen and now - window[0] <= span
+
+    def in_raid(self, guild_id: int, now: float) -> bool:
+        state = self._guilds.get(guild_id)
+        if state is None or not state.raid_until:
+            return False
+        if state.raid_until > now:
+            return True
+        # 落ち着いたので通常モードに戻す
+        state.raid_until = 0.0
+        state.joins.clear()
+        state.messages.clear()
+        logger.info("Raid mode ended in guild %s", guild_id)
+        return False
+
+    def _raise(self, guild_id: int, state: GuildRaidState, now: float) -> bool:
+        """レイドモードに入るか延長し、新たに入ったときは True"""
+        started = not self.in_raid(guild_id, now)
+        state.raid_until = now + RAID_DURATION
+        if started:
+            logger.warning("Raid detected in guild %s", guild_id)
+        return started
+
+    @staticmethod
+    def _drop_old(state: GuildRaidState, now: float) -> None:
+        while state.recent and now - state.recent[0][0] > RECENT_MESSAGE_WINDOW:
+            state.recent.popleft()
+
+    @staticmethod
+    def _take_recent(state: GuildRaidState, now: float, span: float) -> List[discord.Message]:
+        """バーストの判定範囲内の新規メンバーのメッセージを取り出す"""
+        recent = [message for recorded, message in state.recent if now - recorded <= span]
+        state.recent.clear()
+        return recent
+
+    def record_join(self, guild_id: int, now: float) -> Optional[List[discord.Message]]:
+        """参加を記録し、レイドモードが始まったらまとめて削除する直近のメッセージを返す"""
+        state = self._state(guild_id)
+        if not self._is_burst(state.joins, now, JOIN_BURST_WINDOW):
+            return None
+        if not self._raise(guild_id, state, now):
+            return None
+        return self._take_recent(state, now, JOIN_BURST_WINDOW)
+
+    def record_message(
+        self,
+        message: discord.Message,
+        now: float
+    ) -> Optional[List[discord.Message]]:
+        """新規メンバーのメッセージを記録する
+
+        レイドモードが始まったときは、まとめて削除する直近のメッセージを返す。
+        """
+        state = self._state(message.guild.id)
+        raiding = self.in_raid(message.guild.id, now)
+        if not raiding:
+            self._drop_old(state, now)
+            state.recent.append((now, message))
+        if not self._is_burst(state.messages, now, MESSAGE_BURST_WINDOW):
+            return None
+        if not self._raise(message.guild.id, state, now):
+            return None
+        return self._take_recent(state, now, MESSAGE_BURST_WINDOW)
+
 class EnableAnticheatView(View):
     """荒らし対策有効化用のビュー"""
 
-    def __init__(self, guild_id: int) -> None:
+    def __init__(self, guild_id: int, detector: RaidDetector) -> None:
         super().__init__(timeout=BUTTON_TIMEOUT)
         self.guild_id = guild_id
+        self.detector = detector
 
     @discord.ui.button(
         label="登録",
@@ -122,7 +262,7 @@ class EnableAnticheatView(View):
                 )
                 return
 
-            if await AntiRaidDatabase.is_enabled(self.guild_id):
+            if self.guild_id in self.detector.enabled:
                 await interaction.followup.send(
                     ERROR_MESSAGES["already_enabled"],
                     ephemeral=True
@@ -130,6 +270,7 @@ class EnableAnticheatView(View):
                 return
 
             await AntiRaidDatabase.enable(self.guild_id)
+            self.detector.enable(self.guild_id)
             await interaction.edit_original_response(
                 content=SUCCESS_MESSAGES["enabled"]
             )
@@ -148,10 +289,18 @@ class IconCheck(commands.Cog):
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        self.detector = RaidDetector()
+        self.purger = PurgeBatcher(RAID_WARNING)
 
     async def cog_load(self) -> None:
-        """Cogのロード時にDBを初期化"""
+        """Cogのロード時にDBを初期化し、有効なサーバーを読み込む"""
         await AntiRaidDatabase.init_db()
+        # メッセージごとにDBを引かないようメモリに保持する
+        for guild_id in await AntiRaidDatabase.load_enabled():
+            self.detector.enable(guild_id)
+
+    async def cog_unload(self) -> None:
+        await self.purger.close()
 
     def _create_embed(
         self,
@@ -201,7 +350,7 @@ class IconCheck(commands.Cog):
             )
             return
 
-        if await AntiRaidDatabase.is_enabled(interaction.guild_id):
+        if interaction.guild_id in self.detector.enabled:
             await interaction.response.send_message(
                 embed=self._create_embed(
                     "情報",
@@ -217,7 +366,7 @@ class IconCheck(commands.Cog):
             FEATURE_DESCRIPTION,
             "info"
         )
-        view = EnableAnticheatView(interaction.guild_id)
+        view = EnableAnticheatView(interaction.guild_id, self.detector)
         await interaction.response.send_message(
             embed=embed,
             view=view,
@@ -240,7 +389,7 @@ class IconCheck(commands.Cog):
             )
             return
 
-        if not await AntiRaidDatabase.is_enabled(interaction.guild_id):
+        if interaction.guild_id not in self.detector.enabled:
             await interaction.response.send_message(
                 embed=self._create_embed(
                     "情報",
@@ -252,6 +401,7 @@ class IconCheck(commands.Cog):
             return
 
         await AntiRaidDatabase.disable(interaction.guild_id)
+        self.detector.disable(interaction.guild_id)
         await interaction.response.send_message(
             embed=self._create_embed(
                 "完了",
@@ -261,34 +411,68 @@ class IconCheck(commands.Cog):
             ephemeral=True
         )
 
+    async def _announce_raid(self, channel: Optional[discord.abc.Messageable]) -> None:
+        if channel is None:
+            return
+        try:
+            await channel.send(
+                embed=self._create_embed("レイドモード", RAID_NOTICE, "warning")
+            )
+        except discord.HTTPException:
+            pass
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member) -> None:
+        """参加の集中を検知"""
+        if member.guild.id not in self.detector.enabled:
+            return
+        recent = self.detector.record_join(member.guild.id, time.monotonic())
+        if recent is not None:
+            # 参加の集中の直前に新規メンバーが送ったメッセージもまとめて削除
+            for buffered in recent:
+                self.purger.submit(buffered)
+            await self._announce_raid(member.guild.system_channel)
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
         """メッセージ送信時の処理"""
         if message.author.bot or not message.guild:
             return
+        if message.guild.id not in self.detector.enabled:
+            return
 
         try:
-            if await AntiRaidDatabase.is_enabled(message.guild.id):
-                user = message.author
-                is_default_avatar = user.avatar is None
-                created_at_utc = user.created_at.replace(tzinfo=timezone.utc)
-                is_new_account = (
-                    created_at_utc.date() ==
-                    datetime.now(timezone.utc).date()
-                )
+            user = message.author
+            now = datetime.now(timezone.utc)
+            newcomer = is_newcomer(user, now)
+
+            if newcomer:
+                recent = self.detector.record_message(message, time.monotonic())
+                if recent is not None:
+                    # レイド開始: 直前までの新規メンバーのメッセージもまとめて削除
+                    for buffered in recent:
+                        self.purger.submit(buffered)
+                    await self._announce_raid(message.channel)
+                    return
+
+            if self.detector.in_raid(message.guild.id, time.monotonic()):
+                # レイド中は条件を広げ、削除と警告はチャンネルごとにまとめる
+                if newcomer or is_icon_violation(user, now):
+                    self.purger.submit(message)
+                return
 
-                if is_default_avatar and is_new_account:
-                    await message.delete()
-                    warning_embed = self._create_embed(
-                        "警告",
-                        f"{user.mention}、デフォルトのアバターかつ"
-                        "本日作成されたアカウントではメッセージを送信できません。",
-                        "error"
-                    )
-                    warning_message = await message.channel.send(
-                        embed=warning_embed
-                    )
-                    await warning_message.delete(delay=WARNING_DELETE_DELAY)
+            if is_icon_violation(user, now):
+                await message.delete()
+                warning_embed = self._create_embed(
+                    "警告",
+                    f"{user.mention}、デフォルトのアバターかつ"
+                    "本日作成されたアカウントではメッセージを送信できません。",
+                    "error"
+                )
+                warning_message = await message.channel.send(
+                    embed=warning_embed
+                )
+                await warning_message.delete(delay=WARNING_DELETE_DELAY)
 
         except Exception as e:
             logger.error(
@@ -0,0 +1,300 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Final, Optional
+import logging
+
+import aiohttp
+import aiosqlite
+import cv2
+import discord
+from discord.ext import commands
+
+from module.moderation import PurgeBatcher
+from module.phash import BKTree, hash_image
+
+
+DB_PATH: Final[Path] = Path("data/image_blocklist.db")
+
+MAX_IMAGE_BYTES: Final[int] = 8 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE: Final[int] = 64 * 1024
+DOWNLOAD_TIMEOUT: Final[float] = 15.0
+MAX_CONCURRENT_DOWNLOADS: Final[int] = 4
+# ハミング距離がこれ以下なら同じ画像とみなす(64bit中)
+MATCH_DISTANCE: Final[int] = 10
+MAX_BLOCKED_IMAGES: Final[int] = 500  # サーバーごと
+MAX_LABEL_LENGTH: Final[int] = 50
+
+BLOCKED_WARNING: Final[str] = "ブロックリストに登録された画像が投稿されたため削除しました。"
+
+ERROR_MESSAGES: Final[dict] = {
+    "guild_only": "このコマンドはサーバー内でのみ使用できます。",
+    "no_permission": "このコマンドを使用するにはメッセージの管理権限が必要です。",
+    "not_image": "画像ファイルを添付してください。",
+    "too_large": f"画像は{MAX_IMAGE_BYTES // (1024 * 1024)}MBまでです。",
+    "unreadable": "画像を読み込めませんでした。",
+    "blocklist_full": f"ブロックリストは最大{MAX_BLOCKED_IMAGES}件までです。",
+    "not_found": "そのIDの画像は登録されていません。"
+}
+
+SUCCESS_MESSAGES: Final[dict] = {
+    "added": "画像をブロックリストに追加しました。(ID: `{}`)",
+    "removed": "ID `{}` の画像をブロックリストから削除しました。",
+    "empty": "ブロックリストに画像は登録されていません。"
+}
+
+logger = logging.getLogger(__name__)
+
+def is_image(attachment: discord.Attachment) -> bool:
+    return bool(attachment.content_type and attachment.content_type.startswith("image/"))
+
+class ImageBlocklistDatabase:
+    """ブロックする画像のハッシュを管理(ハッシュは16桁の16進数で保存)"""
+
+    @staticmethod
+    async def init_db() -> Dict[int, BKTree]:
+        """DBを初期化し、サーバーごとのBK木を構築"""
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        trees: Dict[int, BKTree] = {}
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS blocked_images (
+                    guild_id INTEGER NOT NULL,
+                    hash TEXT NOT NULL,
+                    label TEXT NOT NULL,
+                    added_by INTEGER NOT NULL,
+                    added_at TEXT NOT NULL,
+                    PRIMARY KEY (guild_id, hash)
+                )
+                """
+            )
+            await db.commit()
+            async with db.execute("SELECT guild_id, hash, label FROM blocked_images") as cursor:
+                async for guild_id, image_id, label in cursor:
+                    trees.setdefault(guild_id, BKTree()).add(int(image_id, 16), label)
+        return trees
+
+    @staticmethod
+    async def add(guild_id: int, image_hash: int, label: str, user_id: int) -> None:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute(
+                """
+                INSERT OR REPLACE INTO blocked_images
+                (guild_id, hash, label, added_by, added_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (guild_id, f"{image_hash:016x}", label, user_id, datetime.now().isoformat())
+            )
+            await db.commit()
+
+    @staticmethod
+    async def remove(guild_id: int, image_id: str) -> bool:
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute(
+                "DELETE FROM blocked_images WHERE guild_id = ? AND hash = ?",
+                (guild_id, image_id)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+
+class ImageBlocklist(commands.Cog):
+    """登録された画像とほぼ同じ画像の投稿を削除する"""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.trees: Dict[int, BKTree] = {}
+        self.purger = PurgeBatcher(BLOCKED_WARNING)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._downloads = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+        self.scanned = 0
+        self.removed = 0
+
+    async def cog_load(self) -> None:
+        self.trees = await ImageBlocklistDatabase.init_db()
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT)
+        )
+
+    async def cog_unload(self) -> None:
+        await self.purger.close()
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def _download(self, attachment: discord.Attachment) -> Optional[bytes]:
+        """上限サイズまでだけ少しずつ読み込む(超えたら None)"""
+        if attachment.size > MAX_IMAGE_BYTES:
+            return None
+        async with self._downloads:
+            async with self._session.get(attachment.url) as response:
+                if response.status != 200:
+                    return None
+                data = bytearray()
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    data.extend(chunk)
+                    if len(data) > MAX_IMAGE_BYTES:
+                        return None
+                return bytes(data)
+
+    async def _hash_attachment(self, attachment: discord.Attachment) -> Optional[int]:
+        try:
+            data = await self._download(attachment)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.debug("Failed to download %s: %s", attachment.url, e)
+            return None
+        if data is None:
+            return None
+        try:
+            return await hash_image(data)
+        except cv2.error as e:
+            # 壊れた画像は読めないものとして扱う
+            logger.debug("Failed to hash %s: %s", attachment.url, e)
+            return None
+
+    def _rebuild_tree(self, guild_id: int, removed: int) -> None:
+        """BK木は削除できないので、残りのハッシュで作り直す"""
+        tree = BKTree()
+        for image_hash, label in self.trees.get(guild_id, ()):
+            if image_hash != removed:
+                tree.add(image_hash, label)
+        if len(tree):
+            self.trees[guild_id] = tree
+        else:
+            self.trees.pop(guild_id, None)
+
+    def get_debug_info(self) -> Dict[str, str]:
+        """管理者向けデバッグ表示用の統計"""
+        return {
+            "Image Blocklist": (
+                f"{len(self.trees)} guilds, "
+                f"{sum(len(tree) for tree in self.trees.values())} images, "
+                f"{self.scanned} scanned, {self.removed} removed"
+            )
+        }
+
+    async def _check_permission(self, interaction: discord.Interaction) -> bool:
+        if not interaction.guild:
+            await interaction.response.send_message(ERROR_MESSAGES["guild_only"], ephemeral=True)
+            return False
+        if not interaction.user.guild_permissions.manage_messages:
+            await interaction.response.send_message(ERROR_MESSAGES["no_permission"], ephemeral=True)
+            return False
+        return True
+
+    @discord.app_commands.command(
+        name="image-block-add",
+        description="投稿を禁止する画像を登録します（少し加工された画像も対象になります）"
+    )
+    @discord.app_commands.describe(image="禁止する画像", label="管理用のメモ")
+    async def image_block_add(
+        self,
+        interaction: discord.Interaction,
+        image: discord.Attachment,
+        label: Optional[str] = None
+    ) -> None:
+        if not await self._check_permission(interaction):
+            return
+        if not is_image(image):
+            await interaction.response.send_message(ERROR_MESSAGES["not_image"], ephemeral=True)
+            return
+        if image.size > MAX_IMAGE_BYTES:
+            await interaction.response.send_message(ERROR_MESSAGES["too_large"], ephemeral=True)
+            return
+        tree = self.trees.get(interaction.guild.id)
+        if tree is not None and len(tree) >= MAX_BLOCKED_IMAGES:
+            await interaction.response.send_message(ERROR_MESSAGES["blocklist_full"], ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        image_hash = await self._hash_attachment(image)
+        if image_hash is None:
+            await interaction.followup.send(ERROR_MESSAGES["unreadable"], ephemeral=True)
+            return
+
+        label = (label or image.filename)[:MAX_LABEL_LENGTH]
+        await ImageBlocklistDatabase.add(
+            interaction.guild.id, image_hash, label, interaction.user.id
+        )
+        # 同じハッシュの登録し直しはラベルの更新として扱う
+        if tree is not None and tree.search(image_hash, 0):
+            self._rebuild_tree(interaction.guild.id, image_hash)
+        self.trees.setdefault(interaction.guild.id, BKTree()).add(image_hash, label)
+        await interaction.followup.send(
+            SUCCESS_MESSAGES["added"].format(f"{image_hash:016x}"),
+            ephemeral=True
+        )
+
+    @discord.app_commands.command(
+        name="image-block-remove",
+        description="画像をブロックリストから削除します"
+    )
+    @discord.app_commands.describe(image_id="/image-block-list で表示されるID")
+    async def image_block_remove(self, interaction: discord.Interaction, image_id: str) -> None:
+        if not await self._check_permission(interaction):
+            return
+        image_id = image_id.strip().lower()
+        try:
+            image_hash = int(image_id, 16)
+        except ValueError:
+            image_hash = None
+        if image_hash is None or not await ImageBlocklistDatabase.remove(
+            interaction.guild.id, f"{image_hash:016x}"
+        ):
+            await interaction.response.send_message(ERROR_MESSAGES["not_found"], ephemeral=True)
+            return
+
+        self._rebuild_tree(interaction.guild.id, image_hash)
+        await interaction.response.send_message(
+            SUCCESS_MESSAGES["removed"].format(f"{image_hash:016x}"),
+            ephemeral=True
+        )
+
+    @discord.app_commands.command(
+        name="image-block-list",
+        description="ブロックリストに登録された画像を表示します"
+    )
+    async def image_block_list(self, interaction: discord.Interaction) -> None:
+        if not await self._check_permission(interaction):
+            return
+        tree = self.trees.get(interaction.guild.id)
+        if not tree:
+            await interaction.response.send_message(SUCCESS_MESSAGES["empty"], ephemeral=True)
+            return
+
+        lines = [f"`{image_hash:016x}` {label}" for image_hash, label in tree]
+        embed = discord.Embed(
+            title=f"画像ブロックリスト ({len(lines)}件)",
+            description="\n".join(lines)[:4000],
+            color=discord.Color.blue()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        if message.author.bot or not message.guild or not message.attachments:
+            return
+        tree = self.trees.get(message.guild.id)
+        if not tree:
+            return
+
+        for attachment in message.attachments:
+            if not is_image(attachment):
+                continue
+            image_hash = await self._hash_attachment(attachment)
+            self.scanned += 1
+            if image_hash is None:
+                continue
+            if matches := tree.search(image_hash, MATCH_DISTANCE):
+                distance, label = matches[0]
+                logger.info(
+                    "Blocked image in guild %s (%s, distance %d)",
+                    message.guild.id, label, distance
+                )
+                self.purger.submit(message)
+                self.removed += 1
+                return
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(ImageBlocklist(bot))
@@ -1,22 +1,68 @@
 import asyncio
+import contextlib
 import os
+import queue
 import re
-import tempfile
-from typing import Final, Optional, Dict, List
+import threading
+import time
+from itertools import islice
+from typing import Callable, Final, Optional, Dict, List
 import logging
+import subprocess
 from pathlib import Path
 from datetime import datetime, timedelta
 
-import edge_tts
 import discord
 from discord.ext import commands
+from discord.oggparse import OggStream
+
+from module.tts_backends import TTSBackend, create_backends
+from module.tts_cache import TTSCache
+from module.voice_settings import DEFAULT_ENGINE, BacklogPolicy, VoiceSettingsStore
 
 
-VOICE: Final[str] = "ja-JP-NanamiNeural"
 MAX_MESSAGE_LENGTH: Final[int] = 75
 RATE_LIMIT_SECONDS: Final[int] = 10
 VOLUME_LEVEL: Final[float] = 0.6
-TEMP_DIR: Final[Path] = Path(tempfile.gettempdir()) / "voice_tts"
+FFMPEG_OPTIONS: Final[str] = f"-filter:a 'volume={VOLUME_LEVEL}'"
+FFMPEG_EXECUTABLE: Final[str] = "ffmpeg"
+# 合成した音声は音量を適用したOpusに一度だけ変換してキャッシュする
+OPUS_BITRATE: Final[str] = "64k"
+OPUS_TRANSCODE_TIMEOUT: Final[float] = 30.0  # seconds
+# キャッシュにない音声を合成しながら再生する
+STREAMING_ENABLED: Final[bool] = True
+STREAM_FIRST_CHUNK_TIMEOUT: Final[float] = 5.0  # seconds
+# 再生中に先読みで合成しておくキューの件数と、先読みの同時合成数の上限
+PREFETCH_DEPTH: Final[int] = 3
+MAX_PREFETCH_SYNTHESES: Final[int] = 4
+MAX_QUEUE_SIZE: Final[int] = 50
+# "auto" はedge_ttsが遅い・失敗するときだけオフラインのエンジンを使う
+ENGINES: Final[Dict[str, str]] = {
+    "auto": "自動(edge_ttsが遅いときはオフライン)",
+    "edge": "edge_tts(オンライン)",
+    "openjtalk": "Open JTalk(オフライン)"
+}
+LOCAL_ENGINE: Final[str] = "openjtalk"
+EDGE_LATENCY_THRESHOLD: Final[float] = 3.0  # seconds
+EDGE_LATENCY_SMOOTHING: Final[float] = 0.3
+LOCAL_FALLBACK_COOLDOWN: Final[float] = 60.0  # seconds
+# ボット全体の同時接続数の上限
+MAX_VOICE_CONNECTIONS: Final[int] = int(os.getenv("MAX_VOICE_CONNECTIONS", "50"))
+# 負荷が高いときの縮退の段階: 0 通常, 1 読み上げを短くする, 2 キャッシュ済みの音声のみ
+DEGRADATION_LABELS: Final[List[str]] = ["normal", "short_text", "cache_only"]
+# 1コアあたりのロードアベレージ・合成待ちの件数が各段階に入る閾値
+LOAD_THRESHOLDS: Final[List[float]] = [0.8, 1.2]
+PENDING_SYNTHESIS_THRESHOLDS: Final[List[int]] = [8, 16]
+DEGRADED_MESSAGE_LENGTH: Final[int] = 30
+
+ANNOUNCEMENTS: Final[Dict[str, str]] = {
+    "join": "{}が参加しました。",
+    "leave": "{}が退出しました。"
+}
+COLLAPSED_ANNOUNCEMENTS: Final[Dict[str, str]] = {
+    "join": "{}ほか{}人が参加しました。",
+    "leave": "{}ほか{}人が退出しました。"
+}
 
 PATTERNS: Final[Dict[str, str]] = {
     "url": r"http[s]?://\S+",
@@ -24,79 +70,514 @@ PATTERNS: Final[Dict[str, str]] = {
     "role_mention": r"<@&[0-9]+>",
     "channel_mention": r"<#[0-9]+>"
 }
+OMITTED_TEXT: Final[str] = "メンション省略"
+MAX_DICTIONARY_WORDS: Final[int] = 200
+MAX_WORD_LENGTH: Final[int] = 50
 
 ERROR_MESSAGES: Final[dict] = {
     "not_in_voice": "先にボイスチャンネルに参加してください。",
     "bot_not_in_voice": "ボイスチャンネルに参加していません。",
     "rate_limit": "レート制限中です。{}秒後にお試しください。",
+    "no_permission": "このコマンドはサーバー管理者のみ実行可能です。",
+    "engine_unavailable": "{} はこの環境では利用できません。",
+    "capacity": "現在ボイス機能が混み合っているため参加できません。しばらくしてからお試しください。",
+    "word_too_long": f"単語と読みは{MAX_WORD_LENGTH}文字以内で指定してください。",
+    "dictionary_full": f"辞書に登録できる単語は{MAX_DICTIONARY_WORDS}個までです。",
+    "word_not_found": "「{}」は辞書に登録されていません。",
     "unexpected": "エラーが発生しました: {}"
 }
 
 SUCCESS_MESSAGES: Final[dict] = {
     "joined": "✅ {} に参加しました。",
     "left": "👋 ボイスチャンネルから退出しました。",
-    "tts_played": "📢 メッセージを読み上げました: {}"
+    "tts_played": "📢 メッセージを読み上げました: {}",
+    "backlog_updated": "読み上げキューの設定を更新しました。",
+    "engine_updated": "読み上げエンジンを {} に設定しました。",
+    "word_added": "「{}」を「{}」と読むように登録しました。",
+    "word_removed": "「{}」を辞書から削除しました。",
+    "dictionary_empty": "辞書に登録されている単語はありません。"
 }
 
 logger = logging.getLogger(__name__)
 
+class AudioStreamBuffer:
+    """合成中の音声チャンクをFFmpegのstdinへ渡すためのバッファ
+
+    FFmpegPCMAudio(pipe=True) の書き込みスレッドから read() が呼ばれる。
+    チャンクが届くまでブロックし、close() 後に読み切ったら b"" を返す。
+    """
+
+    def __init__(self) -> None:
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._pending = b""
+        self._closed = False
+
+    def feed(self, data: bytes) -> None:
+        self._chunks.put(data)
+
+    def close(self) -> None:
+        self._chunks.put(None)
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._pending:
+            if self._closed:
+                return b""
+            data = self._chunks.get()
+            if data is None:
+                self._closed = True
+                return b""
+            self._pending = data
+
+        if size < 0:
+            size = len(self._pending)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+def process_cpu_seconds(pid: int) -> float:
+    """/proc から子プロセスのCPU時間(user + system)を読む"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as file:
+            fields = file.read().rsplit(b")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+class TrackedFFmpegPCMAudio(discord.FFmpegPCMAudio):
+    """起動中のFFmpegの数と、終了時までに使ったCPU時間を記録する"""
+
+    active: int = 0
+    _lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        with self._lock:
+            TrackedFFmpegPCMAudio.active += 1
+        self.cpu_seconds = 0.0
+        self.on_exit: Optional[Callable[[float], None]] = None
+        self._exited = False
+
+    def cleanup(self) -> None:
+        if not self._exited:
+            self._exited = True
+            if pid := getattr(self._process, "pid", None):
+                self.cpu_seconds = process_cpu_seconds(pid)
+            with self._lock:
+                TrackedFFmpegPCMAudio.active -= 1
+            if self.on_exit:
+                self.on_exit(self.cpu_seconds)
+        super().cleanup()
+
+class OpusFileAudio(discord.AudioSource):
+    """Ogg Opusファイルのパケットをそのまま送る音声ソース
+
+    エンコード済みなので再生時にFFmpegを起動せず、Opusへの再エンコードもしない。
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "rb")
+        self._packets = OggStream(self._file).iter_packets()
+
+    def read(self) -> bytes:
+        return next(self._packets, b"")
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self) -> None:
+        self._file.close()
+
 class TTSManager:
-    """TTSの管理を行うクラス"""
+    """TTSの管理を行うクラス
+
+    ギルドごとに選ばれたエンジンで合成する。"auto" ではedge_ttsを使い、
+    応答の遅延が EDGE_LATENCY_THRESHOLD を超えたり失敗したりした場合は
+    一定時間オフラインのエンジンに切り替える。
+    """
 
     def __init__(self) -> None:
-        TEMP_DIR.mkdir(parents=True, exist_ok=True)
-        self.temp_files: List[str] = []
+        self.cache = TTSCache()
+        self.backends: Dict[str, TTSBackend] = create_backends()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._prefetch_slots = asyncio.Semaphore(MAX_PREFETCH_SYNTHESES)
+        self._edge_latency: Optional[float] = None
+        self._fallback_until = 0.0
+        self.active_transcodes = 0
+
+    @property
+    def pending_syntheses(self) -> int:
+        """合成中(先読みを含む)の件数"""
+        return len(self._inflight)
+
+    @property
+    def synthesis_cpu_seconds(self) -> float:
+        """ローカルのエンジンが合成に使ったCPU時間の合計"""
+        return sum(backend.cpu_seconds for backend in self.backends.values())
+
+    async def close(self) -> None:
+        """進行中の合成を止めてからキャッシュの索引を閉じる"""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.cache.close()
+
+    def select_backend(self, engine: str = DEFAULT_ENGINE) -> TTSBackend:
+        """ギルドの設定とedge_ttsの状態から使うエンジンを決める"""
+        if engine != "auto" and engine in self.backends:
+            return self.backends[engine]
+        local = self.backends.get(LOCAL_ENGINE)
+        if local and time.monotonic() < self._fallback_until:
+            return local
+        return self.backends["edge"]
+
+    def prefetch(self, message: str, engine: str = DEFAULT_ENGINE) -> None:
+        """再生前のメッセージをバックグラウンドで合成しておく"""
+        backend = self.select_backend(engine)
+        key = self._make_key(backend, message)
+        if key in self._inflight or key in self.cache:
+            return
 
-    def cleanup_temp_files(self) -> None:
-        """一時ファイルを削除"""
-        for file in self.temp_files:
-            if os.path.exists(file):
-                try:
-                    os.remove(file)
-                    self.temp_files.remove(file)
-                except Exception as e:
-                    logger.error("Error removing temp file: %s", e, exc_info=True)
+        task = self._track(
+            key,
+            asyncio.create_task(
+                self._synthesize(key, message, backend, prefetch=True)
+            )
+        )
+
+        def log_failure(task: asyncio.Task) -> None:
+            if not task.cancelled() and (error := task.exception()):
+                logger.warning("TTS prefetch failed: %s", error)
+
+        task.add_done_callback(log_failure)
+
+    async def create_source(
+        self,
+        message: str,
+        engine: str = DEFAULT_ENGINE,
+        cache_only: bool = False
+    ) -> Optional[discord.AudioSource]:
+        """再生用の音声ソースを作成
+
+        キャッシュになければ合成を始め、ストリーミングできるエンジンなら最初の
+        チャンクが届いた時点でパイプ経由の再生を開始する。失敗した場合はファイル経由に戻し、
+        "auto" ではオフラインのエンジンでも試す。cache_only ではキャッシュにない限り None。
+        """
+        started = time.perf_counter()
+        backend = self.select_backend(engine)
+        key = self._make_key(backend, message)
+        path = await self.cache.get(key)
+        if path is None and cache_only:
+            return None
+        mode = "cache" if path else "file"
+        source: Optional[discord.AudioSource] = None
+
+        if (
+            path is None
+            and STREAMING_ENABLED
+            and backend.supports_streaming
+            and key not in self._inflight
+        ):
+            try:
+                source = await self._open_stream(key, message, backend)
+                mode = "stream"
+            except Exception as e:
+                logger.warning("Streaming TTS failed, falling back to file: %s", e)
+                mode = "fallback"
+
+        if source is None:
+            if path is None:
+                path = await self.generate_audio(message, backend)
+            if path is None and engine == "auto" and backend.name != LOCAL_ENGINE:
+                if local := self.backends.get(LOCAL_ENGINE):
+                    backend = local
+                    path = await self.generate_audio(message, backend)
+                    mode = "local fallback"
+            if path is None:
+                return None
+            source = self._file_source(str(path))
+
+        logger.info(
+            "TTS first audio after %.0f ms (%s, %s)",
+            (time.perf_counter() - started) * 1000, backend.name, mode
+        )
+        return source
+
+    @staticmethod
+    def _make_key(backend: TTSBackend, message: str) -> str:
+        return TTSCache.make_key(backend.cache_voice, message, backend.cache_rate)
+
+    def _record_latency(
+        self,
+        backend: TTSBackend,
+        seconds: Optional[float]
+    ) -> None:
+        """edge_ttsの遅延を指数移動平均で追跡(None は失敗)"""
+        if backend.name != "edge" or LOCAL_ENGINE not in self.backends:
+            return
+        sample = EDGE_LATENCY_THRESHOLD * 2 if seconds is None else seconds
+        if self._edge_latency is None:
+            self._edge_latency = sample
+        else:
+            self._edge_latency += EDGE_LATENCY_SMOOTHING * (sample - self._edge_latency)
+
+        if self._edge_latency > EDGE_LATENCY_THRESHOLD:
+            logger.warning(
+                "edge_tts latency %.1fs is over %.1fs, using offline TTS for %.0fs",
+                self._edge_latency, EDGE_LATENCY_THRESHOLD, LOCAL_FALLBACK_COOLDOWN
+            )
+            self._fallback_until = time.monotonic() + LOCAL_FALLBACK_COOLDOWN
+            # 切り替え後の最初の合成で改めて測り直す
+            self._edge_latency = None
+
+    @staticmethod
+    def _file_source(path: str) -> discord.AudioSource:
+        """Opusに変換済みならそのまま、それ以外はFFmpegで再生"""
+        if path.endswith(".opus"):
+            return OpusFileAudio(path)
+        return TrackedFFmpegPCMAudio(path, options=FFMPEG_OPTIONS)
+
+    async def _open_stream(
+        self,
+        key: str,
+        message: str,
+        backend: TTSBackend
+    ) -> discord.AudioSource:
+        """合成を開始し、最初のチャンクが届いたらパイプ入力のソースを返す"""
+        buffer = AudioStreamBuffer()
+        first_chunk = asyncio.get_running_loop().create_future()
+        task = self._track(
+            key,
+            asyncio.create_task(
+                self._stream(key, message, backend, buffer, first_chunk)
+            )
+        )
+        task.add_done_callback(
+            lambda done: self._log_stream_failure(done, backend, first_chunk)
+        )
+
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(first_chunk),
+                STREAM_FIRST_CHUNK_TIMEOUT
+            )
+        except BaseException:
+            task.cancel()
+            self._inflight.pop(key, None)
+            raise
+        return TrackedFFmpegPCMAudio(buffer, pipe=True, options=FFMPEG_OPTIONS)
+
+    async def _stream(
+        self,
+        key: str,
+        message: str,
+        backend: TTSBackend,
+        buffer: AudioStreamBuffer,
+        first_chunk: asyncio.Future
+    ) -> Path:
+        """チャンクをバッファに流しつつ、同じ内容をキャッシュにも書き込む"""
+        temp_path = self.cache.temp_path(key, backend.extension)
+        started = time.perf_counter()
+        try:
+            # 途中で失敗・取り消しされてもエンジン側の接続を確実に閉じる
+            async with contextlib.aclosing(backend.stream(message)) as chunks:
+                with open(temp_path, "wb") as file:
+                    async for data in chunks:
+                        buffer.feed(data)
+                        file.write(data)
+                        if not first_chunk.done():
+                            first_chunk.set_result(None)
+                            self._record_latency(backend, time.perf_counter() - started)
+            if not first_chunk.done():
+                raise RuntimeError(f"No audio received from {backend.name}")
+            return await self._store(key, temp_path, backend.extension)
+        except BaseException as e:
+            if not first_chunk.done():
+                first_chunk.set_exception(e)
+                if not isinstance(e, asyncio.CancelledError):
+                    self._record_latency(backend, None)
+            raise
+        finally:
+            # 失敗時もFFmpegへのパイプを終端させ、書き込みスレッドを止める
+            buffer.close()
+            temp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _log_stream_failure(
+        task: asyncio.Task,
+        backend: TTSBackend,
+        first_chunk: asyncio.Future
+    ) -> None:
+        """再生開始後の合成の失敗を記録(待つ人がいなくても例外を回収する)"""
+        if task.cancelled() or (e := task.exception()) is None:
+            return
+        # 最初のチャンクより前の失敗は呼び出し側でフォールバックとして記録済み
+        if (
+            first_chunk.done()
+            and not first_chunk.cancelled()
+            and first_chunk.exception() is None
+        ):
+            logger.warning(
+                "Streaming TTS failed after playback started (%s): %s",
+                backend.name, e
+            )
 
     async def generate_audio(
         self,
-        message: str
+        message: str,
+        backend: Optional[TTSBackend] = None
     ) -> Optional[str]:
+        """音声ファイルのパスを返す(キャッシュになければ合成)"""
+        backend = backend or self.select_backend()
+        key = self._make_key(backend, message)
         try:
-            temp_file = TEMP_DIR / f"{hash(message)}.mp3"
-            temp_path = str(temp_file)
-            self.temp_files.append(temp_path)
-
-            tts = edge_tts.Communicate(message, VOICE)
-            await tts.save(temp_path)
-            return temp_path
+            if path := await self.cache.get(key):
+                return str(path)
+
+            # 同じ内容の合成が進行中なら、その結果を待つ
+            if not (task := self._inflight.get(key)):
+                task = self._track(
+                    key,
+                    asyncio.create_task(self._synthesize(key, message, backend))
+                )
+            return str(await asyncio.shield(task))
 
         except Exception as e:
             logger.error("Error generating audio: %s", e, exc_info=True)
             return None
 
+    def _track(self, key: str, task: asyncio.Task) -> asyncio.Task:
+        """進行中の合成として登録し、完了時に登録を外す"""
+        self._inflight[key] = task
+
+        def untrack(_: asyncio.Task) -> None:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+        task.add_done_callback(untrack)
+        return task
+
+    async def _synthesize(
+        self,
+        key: str,
+        message: str,
+        backend: TTSBackend,
+        prefetch: bool = False
+    ) -> Path:
+        """エンジンで合成してキャッシュに登録"""
+        if prefetch:
+            async with self._prefetch_slots:
+                return await self._synthesize(key, message, backend)
+
+        temp_path = self.cache.temp_path(key, backend.extension)
+        started = time.perf_counter()
+        try:
+            try:
+                await backend.synthesize(message, temp_path)
+            except Exception:
+                self._record_latency(backend, None)
+                raise
+            self._record_latency(backend, time.perf_counter() - started)
+            return await self._store(key, temp_path, backend.extension)
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    async def _store(self, key: str, source: Path, extension: str) -> Path:
+        """Opusに変換してキャッシュに登録(変換できなければ元の形式のまま)"""
+        opus_path = self.cache.temp_path(key, "opus")
+        try:
+            if await self._transcode(source, opus_path):
+                return await self.cache.put(key, opus_path, "opus")
+            return await self.cache.put(key, source, extension)
+        finally:
+            opus_path.unlink(missing_ok=True)
+
+    async def _transcode(self, source: Path, destination: Path) -> bool:
+        """音量を適用してOgg Opus (48kHz/2ch, 20msフレーム) に変換"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                FFMPEG_EXECUTABLE, "-y", "-loglevel", "error",
+                "-i", str(source),
+                "-map_metadata", "-1",
+                "-filter:a", f"volume={VOLUME_LEVEL}",
+                "-c:a", "libopus", "-b:a", OPUS_BITRATE,
+                "-ar", "48000", "-ac", "2", "-frame_duration", "20",
+                "-f", "opus", str(destination),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+        except OSError as e:
+            logger.warning("Failed to start ffmpeg for Opus transcode: %s", e)
+            return False
+
+        self.active_transcodes += 1
+        try:
+            _, stderr = await asyncio.wait_for(
+                process.communicate(),
+                OPUS_TRANSCODE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Opus transcode timed out for %s", source.name)
+            return False
+        finally:
+            self.active_transcodes -= 1
+            # タイムアウトやキャンセル時にプロセスを残さない
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+        if process.returncode != 0:
+            logger.warning(
+                "Opus transcode failed (%s): %s",
+                process.returncode, stderr.decode(errors="replace").strip()
+            )
+            return False
+        return True
+
+class ReadingMatcher:
+    """URL・メンションの省略と読み仮名辞書の置き換えを1回の走査で行う
+
+    規則と辞書の単語(長いものを優先)を名前付きグループの1つの正規表現にまとめて
+    コンパイルし、re.sub で文字列を先頭から一度だけ走査する。
+    """
+
+    def __init__(self, readings: Optional[Dict[str, str]] = None) -> None:
+        self.readings = dict(readings or {})
+        parts = [f"(?P<{name}>{pattern})" for name, pattern in PATTERNS.items()]
+        if self.readings:
+            words = sorted(self.readings, key=len, reverse=True)
+            parts.append("(?P<word>" + "|".join(map(re.escape, words)) + ")")
+        self.pattern = re.compile("|".join(parts))
+
+    def apply(self, text: str) -> str:
+        return self.pattern.sub(self._replace, text)
+
+    def _replace(self, match: re.Match) -> str:
+        if match.lastgroup == "word":
+            return self.readings[match.group()]
+        return OMITTED_TEXT
+
 class MessageProcessor:
     """メッセージの処理を行うクラス"""
 
     @staticmethod
-    def sanitize_message(text: str) -> str:
-        result = text
-        for pattern in PATTERNS.values():
-            result = re.sub(pattern, "メンション省略", result)
-        return result
+    def sanitize_message(text: str, matcher: Optional[ReadingMatcher] = None) -> str:
+        return (matcher or DEFAULT_MATCHER).apply(text)
 
     @staticmethod
-    def limit_message(message: str) -> str:
+    def limit_message(message: str, limit: int = MAX_MESSAGE_LENGTH) -> str:
         """メッセージを制限長に収める"""
-        if len(message) > MAX_MESSAGE_LENGTH:
-            return message[:MAX_MESSAGE_LENGTH] + "省略"
+        if len(message) > limit:
+            return message[:limit] + "省略"
         return message
 
     @staticmethod
     def process_message(
         message: str,
-        attachments: List[discord.Attachment] = None
+        attachments: List[discord.Attachment] = None,
+        matcher: Optional[ReadingMatcher] = None
     ) -> str:
-        result = MessageProcessor.sanitize_message(message)
+        result = MessageProcessor.sanitize_message(message, matcher)
         result = MessageProcessor.limit_message(result)
 
         if attachments:
@@ -105,55 +586,375 @@ class MessageProcessor:
 
         return result
 
+DEFAULT_MATCHER: Final[ReadingMatcher] = ReadingMatcher()
+
+class TTSItem:
+    """読み上げキューの1件"""
+
+    def __init__(
+        self,
+        text: str,
+        author_id: Optional[int] = None,
+        kind: str = "message",
+        names: Optional[List[str]] = None
+    ) -> None:
+        self.text = text
+        self.author_id = author_id
+        self.kind = kind  # "message" / "join" / "leave"
+        self.names = names or []
+        self.created = time.monotonic()
+        self.updated = self.created
+
+    @classmethod
+    def announcement(
+        cls,
+        kind: str,
+        name: str,
+        matcher: Optional[ReadingMatcher] = None
+    ) -> "TTSItem":
+        """参加・退出の通知"""
+        name = MessageProcessor.sanitize_message(name, matcher)
+        text = MessageProcessor.limit_message(ANNOUNCEMENTS[kind].format(name))
+        return cls(text, kind=kind, names=[name])
+
+    def absorb(self, other: "TTSItem") -> None:
+        """後から来た項目を1回の読み上げにまとめる"""
+        if self.kind == "message":
+            self.text = f"{self.text}、{other.text}"
+        else:
+            self.names.extend(other.names)
+            self.text = MessageProcessor.limit_message(
+                COLLAPSED_ANNOUNCEMENTS[self.kind].format(
+                    self.names[0], len(self.names) - 1
+                )
+            )
+        self.updated = other.created
+
+class TTSBacklogQueue(asyncio.Queue):
+    """ギルドの方針に従って溜まりすぎないようにする読み上げキュー
+
+    追加時に同じ人の短いメッセージや連続する参加・退出の通知をまとめ、
+    max_depth を超えた分は古いものから捨てる。古くなりすぎたものは取り出し時に捨てる。
+    """
+
+    def __init__(self, policy: BacklogPolicy) -> None:
+        super().__init__(maxsize=MAX_QUEUE_SIZE)
+        self.policy = policy
+        self.shed = 0
+        self.merged = 0
+        self.expired = 0
+
+    def peek(self, count: int) -> List[TTSItem]:
+        return list(islice(self._queue, count))
+
+    def clear(self) -> int:
+        """未再生のメッセージをすべて捨て、その件数を返す"""
+        count = 0
+        while not self.empty():
+            self.get_nowait()
+            self.task_done()
+            count += 1
+        return count
+
+    def offer(self, item: TTSItem) -> None:
+        if self._queue and self._can_merge(self._queue[-1], item):
+            self._queue[-1].absorb(item)
+            self.merged += 1
+            return
+
+        while self.qsize() >= min(self.policy.max_depth, MAX_QUEUE_SIZE):
+            self.get_nowait()
+            self.task_done()
+            self.shed += 1
+        self.put_nowait(item)
+
+    def is_expired(self, item: TTSItem) -> bool:
+        max_age = self.policy.max_age
+        return bool(max_age) and time.monotonic() - item.created > max_age
+
+    def _can_merge(self, last: TTSItem, item: TTSItem) -> bool:
+        if last.kind != item.kind:
+            return False
+        if item.kind != "message":
+            return self.policy.collapse_announcements
+        return (
+            bool(self.policy.merge_window)
+            and item.author_id is not None
+            and last.author_id == item.author_id
+            and item.created - last.updated <= self.policy.merge_window
+            and len(last.text) + len(item.text) + 1 <= MAX_MESSAGE_LENGTH
+        )
+
+class VoiceConnection:
+    """1つのボイス接続の読み上げキューと、それを消化する再生タスク"""
+
+    def __init__(
+        self,
+        voice_client: discord.VoiceClient,
+        tts_manager: TTSManager,
+        policy: BacklogPolicy,
+        engine: str = DEFAULT_ENGINE,
+        load_level: Callable[[], int] = lambda: 0
+    ) -> None:
+        self.voice_client = voice_client
+        self.tts_manager = tts_manager
+        self.queue = TTSBacklogQueue(policy)
+        self.engine = engine
+        self.load_level = load_level
+        self.played = 0
+        self.skipped = 0
+        self.max_depth = 0
+        self.cpu_seconds = 0.0
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """キューの深さと処理件数"""
+        return {
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "played": self.played,
+            "merged": self.queue.merged,
+            "shed": self.queue.shed,
+            "expired": self.queue.expired,
+            "skipped": self.skipped,
+            "cpu_ms": int(self.cpu_seconds * 1000)
+        }
+
+    def enqueue(self, item: TTSItem) -> None:
+        self.queue.offer(item)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        self.prefetch()
+
+    def prefetch(self) -> None:
+        """再生中なら、キューの先頭から PREFETCH_DEPTH 件を先に合成しておく
+
+        再生していないときは次のメッセージをストリーミングで再生するため何もしない。
+        """
+        if not self.voice_client.is_playing() or self.load_level() > 0:
+            return
+        for item in self.queue.peek(PREFETCH_DEPTH):
+            self.tts_manager.prefetch(item.text, self.engine)
+
+    async def close(self) -> None:
+        """再生タスクを止めて切断"""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.queue.clear()
+        if self.voice_client.is_connected():
+            await self.voice_client.disconnect()
+
+    async def _run(self) -> None:
+        while True:
+            item = await self.queue.get()
+            try:
+                if self.queue.is_expired(item):
+                    self.queue.expired += 1
+                    continue
+                await self._play(item.text)
+                self.played += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Error playing TTS: %s", e, exc_info=True)
+            finally:
+                self.queue.task_done()
+
+    async def _play(self, message: str) -> None:
+        """1件を再生し、再生が終わるまで待つ"""
+        # 最も負荷が高い段階ではキャッシュ済みの音声だけを読み上げる
+        cache_only = self.load_level() >= 2
+        source = await self.tts_manager.create_source(
+            message,
+            self.engine,
+            cache_only=cache_only
+        )
+        if not source:
+            if cache_only:
+                self.skipped += 1
+            return
+        if not self.voice_client.is_connected():
+            source.cleanup()
+            return
+
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+
+        if isinstance(source, TrackedFFmpegPCMAudio):
+            def add_cpu(seconds: float) -> None:
+                try:
+                    loop.call_soon_threadsafe(self._add_cpu, seconds)
+                except RuntimeError:
+                    pass  # 終了処理中でループが閉じている
+
+            source.on_exit = add_cpu
+
+        def after_playing(error: Optional[Exception]) -> None:
+            # FFmpegのスレッドから呼ばれるのでループに戻して通知する
+            loop.call_soon_threadsafe(_set_finished, error)
+
+        def _set_finished(error: Optional[Exception]) -> None:
+            if error:
+                logger.error("Error playing audio: %s", error)
+            if not finished.done():
+                finished.set_result(None)
+
+        self.voice_client.play(source, after=after_playing)
+        # 再生中に次のメッセージを合成しておき、再生の間を詰める
+        self.prefetch()
+        try:
+            await finished
+        except asyncio.CancelledError:
+            self.voice_client.stop()
+            raise
+
+    def _add_cpu(self, seconds: float) -> None:
+        self.cpu_seconds += seconds
+
 class VoiceState:
     """ボイスの状態を管理するクラス"""
 
     def __init__(self) -> None:
-        self.voice_clients: Dict[int, Dict[int, discord.VoiceClient]] = {}
+        self.connections: Dict[int, Dict[int, VoiceConnection]] = {}
         self.monitored_channels: Dict[int, int] = {}
-        self.tts_queues: Dict[int, Dict[int, List[str]]] = {}
-        self.locks: Dict[int, asyncio.Lock] = {}
         self.tts_manager = TTSManager()
+        self.settings = VoiceSettingsStore()
+        # guild_id -> (辞書のバージョン, コンパイル済みの置き換え規則)
+        self._matchers: Dict[int, tuple] = {}
+        self._last_level = 0
 
-    def get_lock(self, guild_id: int) -> asyncio.Lock:
-        """ギルドのロックを取得"""
-        if guild_id not in self.locks:
-            self.locks[guild_id] = asyncio.Lock()
-        return self.locks[guild_id]
+    def get_connection(
+        self,
+        guild_id: int,
+        channel_id: int
+    ) -> Optional[VoiceConnection]:
+        return self.connections.get(guild_id, {}).get(channel_id)
 
-    async def play_tts(
+    def add_connection(
         self,
         guild_id: int,
         channel_id: int,
-        message: str
-    ) -> None:
-        voice_client = self.voice_clients[guild_id][channel_id]
-        temp_path = await self.tts_manager.generate_audio(message)
-        if not temp_path:
-            return
-
-        def after_playing(error: Optional[Exception]) -> None:
-            if error:
-                logger.error("Error playing audio: %s", error, exc_info=True)
-
-            # 次のメッセージを再生
-            if (guild_id in self.tts_queues and
-                channel_id in self.tts_queues[guild_id] and
-                self.tts_queues[guild_id][channel_id]):
-                next_message = self.tts_queues[guild_id][channel_id].pop(0)
-                asyncio.run_coroutine_threadsafe(
-                    self.play_tts(guild_id, channel_id, next_message),
-                    voice_client.loop
+        voice_client: discord.VoiceClient
+    ) -> VoiceConnection:
+        connection = VoiceConnection(
+            voice_client,
+            self.tts_manager,
+            self.settings.get_policy(guild_id),
+            self.settings.get_engine(guild_id),
+            self.degradation_level
+        )
+        self.connections.setdefault(guild_id, {})[channel_id] = connection
+        return connection
+
+    async def remove_connection(self, guild_id: int, channel_id: int) -> None:
+        """接続を閉じ、キューを破棄"""
+        connection = self.connections.get(guild_id, {}).pop(channel_id, None)
+        if guild_id in self.connections and not self.connections[guild_id]:
+            del self.connections[guild_id]
+        if connection:
+            logger.info(
+                "Closing voice connection %s: %s", channel_id, connection.stats
+            )
+            await connection.close()
+
+    def enqueue(self, guild_id: int, channel_id: int, item: TTSItem) -> bool:
+        """接続中のチャンネルなら読み上げキューに追加"""
+        if connection := self.get_connection(guild_id, channel_id):
+            if self.degradation_level() > 0:
+                item.text = MessageProcessor.limit_message(
+                    item.text,
+                    DEGRADED_MESSAGE_LENGTH
                 )
-
-        voice_client.play(
-            discord.FFmpegPCMAudio(
-                temp_path,
-                options=f"-filter:a 'volume={VOLUME_LEVEL}'"
-            ),
-            after=after_playing
+            connection.enqueue(item)
+            return True
+        return False
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(guild_connections) for guild_connections in self.connections.values())
+
+    @property
+    def ffmpeg_processes(self) -> int:
+        """再生中と変換中のFFmpegの数"""
+        return TrackedFFmpegPCMAudio.active + self.tts_manager.active_transcodes
+
+    def can_accept_connection(self) -> bool:
+        """新しい接続を受け付けられるか"""
+        return (
+            self.connection_count < MAX_VOICE_CONNECTIONS
+            and self.degradation_level() < len(DEGRADATION_LABELS) - 1
         )
 
+    def degradation_level(self) -> int:
+        """ホストの負荷と合成待ちの件数から縮退の段階を求める"""
+        try:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except OSError:
+            load = 0.0
+        pending = self.tts_manager.pending_syntheses
+
+        level = 0
+        for i, (load_limit, pending_limit) in enumerate(
+            zip(LOAD_THRESHOLDS, PENDING_SYNTHESIS_THRESHOLDS),
+            start=1
+        ):
+            if load >= load_limit or pending >= pending_limit:
+                level = i
+
+        if level != self._last_level:
+            logger.warning(
+                "Voice degradation %s -> %s (load %.2f/core, %s pending syntheses)",
+                DEGRADATION_LABELS[self._last_level], DEGRADATION_LABELS[level],
+                load, pending
+            )
+            self._last_level = level
+        return level
+
+    async def set_policy(self, guild_id: int, policy: BacklogPolicy) -> None:
+        """方針を保存し、接続中のキューにも反映"""
+        await self.settings.set_policy(guild_id, policy)
+        for connection in self.connections.get(guild_id, {}).values():
+            connection.queue.policy = policy
+
+    def get_matcher(self, guild_id: int) -> ReadingMatcher:
+        """ギルドの辞書を反映した置き換え規則(辞書が変わったときだけ作り直す)"""
+        version = self.settings.get_reading_version(guild_id)
+        cached = self._matchers.get(guild_id)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        readings = self.settings.get_readings(guild_id)
+        matcher = ReadingMatcher(readings) if readings else DEFAULT_MATCHER
+        self._matchers[guild_id] = (version, matcher)
+        return matcher
+
+    async def set_engine(self, guild_id: int, engine: str) -> None:
+        """エンジンを保存し、接続中の読み上げにも反映"""
+        await self.settings.set_engine(guild_id, engine)
+        for connection in self.connections.get(guild_id, {}).values():
+            connection.engine = engine
+
+    def get_stats(self) -> Dict[str, object]:
+        """全接続の合計と、ボイス機能全体の負荷"""
+        totals: Dict[str, object] = {
+            "connections": 0,
+            "max_connections": MAX_VOICE_CONNECTIONS,
+            "ffmpeg_processes": self.ffmpeg_processes,
+            "pending_syntheses": self.tts_manager.pending_syntheses,
+            "synthesis_cpu_ms": int(self.tts_manager.synthesis_cpu_seconds * 1000),
+            "degradation": DEGRADATION_LABELS[self.degradation_level()]
+        }
+        for guild_connections in self.connections.values():
+            for connection in guild_connections.values():
+                totals["connections"] += 1
+                for name, value in connection.stats.items():
+                    if name != "max_depth":
+                        totals[name] = totals.get(name, 0) + value
+        return totals
+
 class Voice(commands.Cog):
     """音声機能を提供"""
 
@@ -208,20 +1009,27 @@ class Voice(commands.Cog):
                 )
                 return
 
-            # ボイスチャンネルに接続
-            if (guild_id in self.state.voice_clients and
-                channel_id in self.state.voice_clients[guild_id]):
-                await self.state.voice_clients[guild_id][channel_id].move_to(
-                    voice_channel
+            # 混み合っているときは新しい接続を断る
+            connection = self.state.get_connection(guild_id, channel_id)
+            if not connection and not self.state.can_accept_connection():
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["capacity"],
+                    ephemeral=True
                 )
+                return
+
+            # ボイスチャンネルに接続(接続ごとに読み上げキューと再生タスクを持つ)
+            if connection:
+                await connection.voice_client.move_to(voice_channel)
             else:
-                voice_client = await voice_channel.connect()
-                if guild_id not in self.state.voice_clients:
-                    self.state.voice_clients[guild_id] = {}
-                self.state.voice_clients[guild_id][channel_id] = voice_client
+                connection = self.state.add_connection(
+                    guild_id,
+                    channel_id,
+                    await voice_channel.connect()
+                )
 
             # ボットをミュート
-            voice_client = self.state.voice_clients[guild_id][channel_id]
+            voice_client = connection.voice_client
             await voice_client.guild.change_voice_state(
                 channel=voice_client.channel,
                 self_deaf=True
@@ -230,11 +1038,6 @@ class Voice(commands.Cog):
             # チャンネルの監視を開始
             self.state.monitored_channels[guild_id] = interaction.channel.id
 
-            # TTSキューを初期化
-            if guild_id not in self.state.tts_queues:
-                self.state.tts_queues[guild_id] = {}
-            self.state.tts_queues[guild_id][channel_id] = []
-
             # レート制限の更新
             self._last_uses[interaction.user.id] = datetime.now()
 
@@ -271,8 +1074,7 @@ class Voice(commands.Cog):
             guild_id = interaction.guild.id
             channel_id = member.voice.channel.id
 
-            if (guild_id not in self.state.voice_clients or
-                channel_id not in self.state.voice_clients[guild_id]):
+            if not self.state.get_connection(guild_id, channel_id):
                 await interaction.response.send_message(
                     ERROR_MESSAGES["bot_not_in_voice"],
                     ephemeral=True
@@ -290,23 +1092,13 @@ class Voice(commands.Cog):
                 )
                 return
 
-            # ボイスチャンネルから切断
-            await self.state.voice_clients[guild_id][channel_id].disconnect()
-            del self.state.voice_clients[guild_id][channel_id]
-            if not self.state.voice_clients[guild_id]:
-                del self.state.voice_clients[guild_id]
+            # 再生タスクを止め、キューを破棄して切断
+            await self.state.remove_connection(guild_id, channel_id)
 
             # 監視を停止
             if guild_id in self.state.monitored_channels:
                 del self.state.monitored_channels[guild_id]
 
-            # TTSキューをクリア
-            if guild_id in self.state.tts_queues:
-                if channel_id in self.state.tts_queues[guild_id]:
-                    del self.state.tts_queues[guild_id][channel_id]
-                if not self.state.tts_queues[guild_id]:
-                    del self.state.tts_queues[guild_id]
-
             # レート制限の更新
             self._last_uses[interaction.user.id] = datetime.now()
 
@@ -343,8 +1135,7 @@ class Voice(commands.Cog):
             guild_id = interaction.guild.id
             channel_id = member.voice.channel.id
 
-            if (guild_id not in self.state.voice_clients or
-                channel_id not in self.state.voice_clients[guild_id]):
+            if not self.state.get_connection(guild_id, channel_id):
                 await interaction.response.send_message(
                     ERROR_MESSAGES["bot_not_in_voice"],
                     ephemeral=True
@@ -363,22 +1154,17 @@ class Voice(commands.Cog):
                 return
 
             # メッセージを処理
-            processed_message = MessageProcessor.process_message(message)
-
-            async with self.state.get_lock(guild_id):
-                # キューにメッセージを追加
-                self.state.tts_queues[guild_id][channel_id].append(
-                    processed_message
-                )
+            processed_message = MessageProcessor.process_message(
+                message,
+                matcher=self.state.get_matcher(guild_id)
+            )
 
-                # 再生中でなければ再生開始
-                if not self.state.voice_clients[guild_id][channel_id].is_playing():
-                    next_message = self.state.tts_queues[guild_id][channel_id].pop(0)
-                    await self.state.play_tts(
-                        guild_id,
-                        channel_id,
-                        next_message
-                    )
+            # キューにメッセージを追加(再生は接続ごとの再生タスクが行う)
+            self.state.enqueue(
+                guild_id,
+                channel_id,
+                TTSItem(processed_message, author_id=interaction.user.id)
+            )
 
             # レート制限の更新
             self._last_uses[interaction.user.id] = datetime.now()
@@ -407,50 +1193,39 @@ class Voice(commands.Cog):
             # ボットだけになった場合は切断
             if voice_client := member.guild.voice_client:
                 if len(voice_client.channel.members) == 1:
-                    await voice_client.disconnect()
+                    await self.state.remove_connection(
+                        member.guild.id,
+                        voice_client.channel.id
+                    )
+                    if voice_client.is_connected():
+                        await voice_client.disconnect()
                     return
 
             guild_id = member.guild.id
 
             # 参加時の処理
             if before.channel is None and after.channel is not None:
-                channel_id = after.channel.id
-                if (guild_id in self.state.voice_clients and
-                    channel_id in self.state.voice_clients[guild_id]):
-                    message = f"{member.display_name}が参加しました。"
-                    processed_message = MessageProcessor.process_message(message)
-
-                    async with self.state.get_lock(guild_id):
-                        self.state.tts_queues[guild_id][channel_id].append(
-                            processed_message
-                        )
-                        if not self.state.voice_clients[guild_id][channel_id].is_playing():
-                            next_message = self.state.tts_queues[guild_id][channel_id].pop(0)
-                            await self.state.play_tts(
-                                guild_id,
-                                channel_id,
-                                next_message
-                            )
+                self.state.enqueue(
+                    guild_id,
+                    after.channel.id,
+                    TTSItem.announcement(
+                        "join",
+                        member.display_name,
+                        self.state.get_matcher(guild_id)
+                    )
+                )
 
             # 退出時の処理
             elif before.channel is not None and after.channel is None:
-                channel_id = before.channel.id
-                if (guild_id in self.state.voice_clients and
-                    channel_id in self.state.voice_clients[guild_id]):
-                    message = f"{member.display_name}が退出しました。"
-                    processed_message = MessageProcessor.process_message(message)
-
-                    async with self.state.get_lock(guild_id):
-                        self.state.tts_queues[guild_id][channel_id].append(
-                            processed_message
-                        )
-                        if not self.state.voice_clients[guild_id][channel_id].is_playing():
-                            next_message = self.state.tts_queues[guild_id][channel_id].pop(0)
-                            await self.state.play_tts(
-                                guild_id,
-                                channel_id,
-                                next_message
-                            )
+                self.state.enqueue(
+                    guild_id,
+                    before.channel.id,
+                    TTSItem.announcement(
+                        "leave",
+                        member.display_name,
+                        self.state.get_matcher(guild_id)
+                    )
+                )
 
         except Exception as e:
             logger.error(
@@ -478,26 +1253,21 @@ class Voice(commands.Cog):
                 return
 
             channel_id = message.author.voice.channel.id
-            if (guild_id not in self.state.voice_clients or
-                channel_id not in self.state.voice_clients[guild_id]):
+            if not self.state.get_connection(guild_id, channel_id):
                 return
 
-            processed_message = MessageProcessor.process_message(
-                message.content,
-                message.attachments
-            )
-
-            async with self.state.get_lock(guild_id):
-                self.state.tts_queues[guild_id][channel_id].append(
-                    processed_message
+            self.state.enqueue(
+                guild_id,
+                channel_id,
+                TTSItem(
+                    MessageProcessor.process_message(
+                        message.content,
+                        message.attachments,
+                        self.state.get_matcher(guild_id)
+                    ),
+                    author_id=message.author.id
                 )
-                if not self.state.voice_clients[guild_id][channel_id].is_playing():
-                    next_message = self.state.tts_queues[guild_id][channel_id].pop(0)
-                    await self.state.play_tts(
-                        guild_id,
-                        channel_id,
-                        next_message
-                    )
+            )
 
         except Exception as e:
             logger.error(
@@ -506,16 +1276,290 @@ class Voice(commands.Cog):
                 exc_info=True
             )
 
+    @discord.app_commands.command(
+        name="vc-backlog",
+        description="読み上げが溜まったときの間引き方を設定します"
+    )
+    @discord.app_commands.describe(
+        max_depth=f"読み上げ待ちの最大件数(超えたら古いものから捨てる, 1-{MAX_QUEUE_SIZE})",
+        max_age="この秒数より古いメッセージは読み上げない(0で無効)",
+        merge_window="同じ人がこの秒数以内に送った短いメッセージをまとめる(0で無効)",
+        collapse_announcements="連続する参加・退出の通知を1つにまとめる"
+    )
+    async def vc_backlog(
+        self,
+        interaction: discord.Interaction,
+        max_depth: Optional[discord.app_commands.Range[int, 1, MAX_QUEUE_SIZE]] = None,
+        max_age: Optional[discord.app_commands.Range[int, 0, 3600]] = None,
+        merge_window: Optional[discord.app_commands.Range[int, 0, 60]] = None,
+        collapse_announcements: Optional[bool] = None
+    ) -> None:
+        """読み上げキューの方針を表示・変更"""
+        try:
+            changes = {
+                "max_depth": max_depth,
+                "max_age": max_age,
+                "merge_window": merge_window,
+                "collapse_announcements": collapse_announcements
+            }
+            policy = self.state.settings.get_policy(interaction.guild_id)
+            updated = any(value is not None for value in changes.values())
+
+            if updated:
+                if not interaction.user.guild_permissions.administrator:
+                    await interaction.response.send_message(
+                        ERROR_MESSAGES["no_permission"],
+                        ephemeral=True
+                    )
+                    return
+                policy = policy.replace(**changes)
+                await self.state.set_policy(interaction.guild_id, policy)
+
+            embed = discord.Embed(
+                title="読み上げキューの設定",
+                description=SUCCESS_MESSAGES["backlog_updated"] if updated else None,
+                color=discord.Color.green() if updated else discord.Color.blue()
+            )
+            fields = {
+                "最大件数": f"{policy.max_depth}件",
+                "読み上げ期限": f"{policy.max_age}秒" if policy.max_age else "無効",
+                "連投のまとめ": (
+                    f"{policy.merge_window}秒以内" if policy.merge_window else "無効"
+                ),
+                "参加・退出のまとめ": "有効" if policy.collapse_announcements else "無効"
+            }
+            for name, value in fields.items():
+                embed.add_field(name=name, value=value, inline=True)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            logger.error("Error in vc_backlog command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                ERROR_MESSAGES["unexpected"].format(str(e)),
+                ephemeral=True
+            )
+
+    @discord.app_commands.command(
+        name="vc-engine",
+        description="読み上げに使う音声合成エンジンを設定します"
+    )
+    @discord.app_commands.describe(engine="使用するエンジン")
+    @discord.app_commands.choices(engine=[
+        discord.app_commands.Choice(name=label, value=name)
+        for name, label in ENGINES.items()
+    ])
+    async def vc_engine(
+        self,
+        interaction: discord.Interaction,
+        engine: str
+    ) -> None:
+        """ギルドの読み上げエンジンを変更"""
+        try:
+            if not interaction.user.guild_permissions.administrator:
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["no_permission"],
+                    ephemeral=True
+                )
+                return
+
+            if engine != "auto" and engine not in self.state.tts_manager.backends:
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["engine_unavailable"].format(ENGINES[engine]),
+                    ephemeral=True
+                )
+                return
+
+            await self.state.set_engine(interaction.guild_id, engine)
+            await interaction.response.send_message(
+                SUCCESS_MESSAGES["engine_updated"].format(ENGINES[engine]),
+                ephemeral=True
+            )
+
+        except Exception as e:
+            logger.error("Error in vc_engine command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                ERROR_MESSAGES["unexpected"].format(str(e)),
+                ephemeral=True
+            )
+
+    @discord.app_commands.command(
+        name="vc-dict-add",
+        description="読み上げ辞書に単語の読みを登録します"
+    )
+    @discord.app_commands.describe(
+        word="読み方を指定する単語(カスタム絵文字もそのまま指定できます)",
+        reading="読み方"
+    )
+    async def vc_dict_add(
+        self,
+        interaction: discord.Interaction,
+        word: str,
+        reading: str
+    ) -> None:
+        try:
+            if not interaction.user.guild_permissions.administrator:
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["no_permission"],
+                    ephemeral=True
+                )
+                return
+
+            word, reading = word.strip(), reading.strip()
+            if not word or len(word) > MAX_WORD_LENGTH or len(reading) > MAX_WORD_LENGTH:
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["word_too_long"],
+                    ephemeral=True
+                )
+                return
+
+            readings = self.state.settings.get_readings(interaction.guild_id)
+            if word not in readings and len(readings) >= MAX_DICTIONARY_WORDS:
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["dictionary_full"],
+                    ephemeral=True
+                )
+                return
+
+            await self.state.settings.set_reading(interaction.guild_id, word, reading)
+            await interaction.response.send_message(
+                SUCCESS_MESSAGES["word_added"].format(word, reading)
+            )
+
+        except Exception as e:
+            logger.error("Error in vc_dict_add command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                ERROR_MESSAGES["unexpected"].format(str(e)),
+                ephemeral=True
+            )
+
+    @discord.app_commands.command(
+        name="vc-dict-remove",
+        description="読み上げ辞書から単語を削除します"
+    )
+    @discord.app_commands.describe(word="削除する単語")
+    async def vc_dict_remove(
+        self,
+        interaction: discord.Interaction,
+        word: str
+    ) -> None:
+        try:
+            if not interaction.user.guild_permissions.administrator:
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["no_permission"],
+                    ephemeral=True
+                )
+                return
+
+            word = word.strip()
+            if not await self.state.settings.remove_reading(interaction.guild_id, word):
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["word_not_found"].format(word),
+                    ephemeral=True
+                )
+                return
+
+            await interaction.response.send_message(
+                SUCCESS_MESSAGES["word_removed"].format(word)
+            )
+
+        except Exception as e:
+            logger.error("Error in vc_dict_remove command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                ERROR_MESSAGES["unexpected"].format(str(e)),
+                ephemeral=True
+            )
+
+    @discord.app_commands.command(
+        name="vc-dict-list",
+        description="読み上げ辞書に登録されている単語を表示します"
+    )
+    async def vc_dict_list(
+        self,
+        interaction: discord.Interaction
+    ) -> None:
+        try:
+            readings = self.state.settings.get_readings(interaction.guild_id)
+            if not readings:
+                await interaction.response.send_message(
+                    SUCCESS_MESSAGES["dictionary_empty"],
+                    ephemeral=True
+                )
+                return
+
+            lines = [f"{word} → {reading}" for word, reading in sorted(readings.items())]
+            embed = discord.Embed(
+                title=f"読み上げ辞書 ({len(readings)}/{MAX_DICTIONARY_WORDS})",
+                description="\n".join(lines)[:4096],
+                color=discord.Color.blue()
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            logger.error("Error in vc_dict_list command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                ERROR_MESSAGES["unexpected"].format(str(e)),
+                ephemeral=True
+            )
+
+    @discord.app_commands.command(
+        name="vc-status",
+        description="読み上げ機能の負荷と、このサーバーの読み上げキューの状態を表示します"
+    )
+    async def vc_status(
+        self,
+        interaction: discord.Interaction
+    ) -> None:
+        try:
+            stats = self.state.get_stats()
+            embed = discord.Embed(
+                title="読み上げ機能の状態",
+                color=discord.Color.blue()
+            )
+            embed.add_field(
+                name="全体",
+                value=(
+                    f"接続数: {stats['connections']}/{stats['max_connections']}\n"
+                    f"FFmpeg: {stats['ffmpeg_processes']}\n"
+                    f"合成待ち: {stats['pending_syntheses']}\n"
+                    f"状態: {stats['degradation']}"
+                ),
+                inline=False
+            )
+            for channel_id, connection in self.state.connections.get(
+                interaction.guild_id, {}
+            ).items():
+                connection_stats = connection.stats
+                embed.add_field(
+                    name=f"<#{channel_id}>",
+                    value="\n".join(
+                        f"{name}: {value}" for name, value in connection_stats.items()
+                    ),
+                    inline=True
+                )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            logger.error("Error in vc_status command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                ERROR_MESSAGES["unexpected"].format(str(e)),
+                ephemeral=True
+            )
+
+    async def cog_load(self) -> None:
+        """キャッシュの索引とギルドごとの設定を読み込む"""
+        await self.state.tts_manager.cache.initialize()
+        await self.state.settings.initialize()
+
     async def cog_unload(self) -> None:
         """Cogのアンロード時の処理"""
-        # 一時ファイルの削除
-        self.state.tts_manager.cleanup_temp_files()
-
-        # ボイスクライアントの切断
-        for guild_clients in self.state.voice_clients.values():
-            for client in guild_clients.values():
-                if client.is_connected():
-                    await client.disconnect()
+        # 再生タスクを止めて切断
+        for guild_id, guild_connections in list(self.state.connections.items()):
+            for channel_id in list(guild_connections):
+                await self.state.remove_connection(guild_id, channel_id)
+
+        # キャッシュの索引と設定を閉じる
+        await self.state.tts_manager.close()
+        await self.state.settings.close()
 
 
 async def setup(bot: commands.Bot) -> None:
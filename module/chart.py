@@ -0,0 +1,208 @@
+import hashlib
+import io
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Final, Iterable, List, Optional, Tuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from module.workers import run_in_worker
+
+
+MAX_SCATTER_POINTS: Final[int] = 1500
+CACHE_MAX_BYTES: Final[int] = 16 * 1024 * 1024
+DPI: Final[int] = 100
+# matplotlibの日付数値は1970-01-01からの日数
+EPOCH_ORDINAL: Final[int] = date(1970, 1, 1).toordinal()
+
+IMAGE_FORMATS: Final[Dict[str, Dict[str, Any]]] = {
+    "png": {"pil_kwargs": {"optimize": True, "compress_level": 9}},
+    "webp": {"pil_kwargs": {"lossless": True, "method": 6}}
+}
+
+
+def _to_ordinal(value: Any) -> float:
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    if isinstance(value, datetime):
+        seconds = value.hour * 3600 + value.minute * 60 + value.second
+        return value.toordinal() + seconds / 86400
+    return float(value.toordinal())
+
+
+def to_ordinals(dates: Iterable[Any]) -> np.ndarray:
+    """日付の並び(datetime / Timestamp / 序数)を序数の配列に変換"""
+    if isinstance(dates, np.ndarray) and dates.dtype.kind in "iuf":
+        return dates.astype(np.float64)
+    return np.fromiter((_to_ordinal(d) for d in dates), dtype=np.float64)
+
+
+def downsample(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_points: int = MAX_SCATTER_POINTS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """最初と最後の点を残して等間隔に間引く"""
+    if len(x) <= max_points:
+        return x, y
+    index = np.unique(np.linspace(0, len(x) - 1, max_points).round().astype(np.int64))
+    return x[index], y[index]
+
+
+class ChartRequest:
+    """描画内容の定義。内容が同じなら同じキャッシュキーになる"""
+
+    def __init__(
+        self,
+        title: str,
+        *,
+        xlabel: str = "Date",
+        ylabel: str = "Member Count",
+        size: Tuple[int, int] = (12, 8),
+        image_format: str = "png",
+        fontsize: Optional[Dict[str, int]] = None,
+        grid_alpha: float = 0.6
+    ) -> None:
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.size = size
+        self.image_format = image_format
+        self.fontsize = fontsize or {}
+        self.grid_alpha = grid_alpha
+        self.elements: List[Tuple[str, Dict[str, Any]]] = []
+
+    def scatter(
+        self,
+        dates: Iterable[Any],
+        values: Iterable[float],
+        **style: Any
+    ) -> "ChartRequest":
+        """散布図を追加(点数が多い場合は間引く)"""
+        x, y = downsample(to_ordinals(dates), np.asarray(values, dtype=np.float64))
+        self.elements.append(("scatter", {"x": x, "y": y, **style}))
+        return self
+
+    def line(
+        self,
+        dates: Iterable[Any],
+        values: Iterable[float],
+        **style: Any
+    ) -> "ChartRequest":
+        """折れ線を追加"""
+        x = to_ordinals(dates)
+        y = np.asarray(values, dtype=np.float64)
+        self.elements.append(("line", {"x": x, "y": y, **style}))
+        return self
+
+    def hline(self, y: float, **style: Any) -> "ChartRequest":
+        """水平線を追加"""
+        self.elements.append(("hline", {"y": float(y), **style}))
+        return self
+
+    def vline(self, when: Any, **style: Any) -> "ChartRequest":
+        """垂直線を追加"""
+        self.elements.append(("vline", {"x": float(to_ordinals([when])[0]), **style}))
+        return self
+
+    def cache_key(self) -> str:
+        digest = hashlib.sha256()
+        digest.update(repr((
+            self.title, self.xlabel, self.ylabel, self.size,
+            self.image_format, sorted(self.fontsize.items()), self.grid_alpha
+        )).encode())
+        for kind, params in self.elements:
+            digest.update(kind.encode())
+            for key in sorted(params):
+                value = params[key]
+                digest.update(key.encode())
+                if isinstance(value, np.ndarray):
+                    digest.update(value.tobytes())
+                else:
+                    digest.update(repr(value).encode())
+        return digest.hexdigest()
+
+
+class ChartRenderer:
+    """オブジェクト指向APIでグラフを描画し、結果をキャッシュする
+
+    pyplotのグローバル状態を使わないため、ワーカースレッドから安全に呼び出せる。
+    """
+
+    def __init__(self, max_cache_bytes: int = CACHE_MAX_BYTES) -> None:
+        self.max_cache_bytes = max_cache_bytes
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cache_bytes = 0
+
+    async def render(self, request: ChartRequest) -> io.BytesIO:
+        """グラフを描画(キャッシュ済みならそれを返す)"""
+        key = request.cache_key()
+        if (data := self._cache.get(key)) is not None:
+            self._cache.move_to_end(key)
+            return io.BytesIO(data)
+
+        data = await run_in_worker(self.render_sync, request)
+        self._store(key, data)
+        return io.BytesIO(data)
+
+    def _store(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_cache_bytes:
+            return
+        if key in self._cache:
+            return
+        self._cache[key] = data
+        self._cache_bytes += len(data)
+        while self._cache_bytes > self.max_cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    @staticmethod
+    def render_sync(request: ChartRequest) -> bytes:
+        """グラフを描画して画像のバイト列を返す"""
+        fig = Figure(figsize=request.size)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+
+        for kind, params in request.elements:
+            params = dict(params)
+            if kind == "scatter":
+                ax.scatter(params.pop("x") - EPOCH_ORDINAL, params.pop("y"), **params)
+            elif kind == "line":
+                ax.plot(params.pop("x") - EPOCH_ORDINAL, params.pop("y"), **params)
+            elif kind == "hline":
+                ax.axhline(**params)
+            elif kind == "vline":
+                ax.axvline(x=params.pop("x") - EPOCH_ORDINAL, **params)
+
+        ax.xaxis_date()
+        ax.set_xlabel(request.xlabel, fontsize=request.fontsize.get("label"))
+        ax.set_ylabel(request.ylabel, fontsize=request.fontsize.get("label"))
+        ax.set_title(request.title, fontsize=request.fontsize.get("title"))
+        ax.legend()
+        ax.grid(True, linestyle="--", alpha=request.grid_alpha)
+
+        buf = io.BytesIO()
+        fig.savefig(
+            buf,
+            format=request.image_format,
+            dpi=DPI,
+            bbox_inches="tight",
+            **IMAGE_FORMATS[request.image_format]
+        )
+        return buf.getvalue()
+
+
+_renderer: Optional[ChartRenderer] = None
+
+
+def get_renderer() -> ChartRenderer:
+    """全コグで共有する描画器を取得(画像キャッシュを1つにまとめる)"""
+    global _renderer
+    if _renderer is None:
+        _renderer = ChartRenderer()
+    return _renderer
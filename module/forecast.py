@@ -0,0 +1,323 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+import time
+from typing import Any, Callable, Dict, Final, List, Optional, Tuple
+import logging
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import PolynomialFeatures
+
+from module.chart import ChartRequest
+from module.growth_store import GrowthSeries
+
+
+POLYNOMIAL_DEGREE: Final[int] = 3
+POLYNOMIAL_PREDICTION_DAYS: Final[int] = 36500  # 100年分
+ARIMA_FORECAST_DAYS: Final[int] = 365
+ARIMA_ORDERS: Final[List[Tuple[int, int, int]]] = [
+    (0, 1, 0), (1, 1, 0), (1, 1, 1), (2, 1, 0)
+]
+PROPHET_PREDICTION_DAYS: Final[int] = 92  # 約3ヶ月
+
+PROPHET_CONFIG: Final[dict] = {
+    "n_changepoints": 100,
+    "changepoint_prior_scale": 0.1,
+    "seasonality_mode": "multiplicative",
+    "weekly_seasonality": {
+        "name": "weekly",
+        "period": 7,
+        "fourier_order": 3
+    }
+}
+
+GRAPH_SETTINGS: Final[dict] = {
+    "colors": {
+        "actual": "blue",
+        "prediction": "red",
+        "target": "green",
+        "date": "purple"
+    },
+    "alpha": 0.6,
+    "linewidth": 2,
+    "fontsize": {
+        "label": 14,
+        "title": 16
+    }
+}
+
+# progress(stage, detail) の形で呼び出される。ワーカースレッドから呼ばれる
+ProgressCallback = Callable[..., None]
+
+logger = logging.getLogger(__name__)
+
+
+def _report(
+    progress: Optional[ProgressCallback],
+    stage: str,
+    detail: Optional[str] = None
+) -> None:
+    if progress:
+        progress(stage, detail)
+
+
+def r2_score(y: np.ndarray, y_pred: np.ndarray) -> float:
+    """決定係数を計算"""
+    total = float(np.sum((y - np.mean(y)) ** 2))
+    if total == 0:
+        return 0.0
+    return 1 - float(np.sum((y - y_pred) ** 2)) / total
+
+
+def fit_timed(
+    forecaster: "Forecaster",
+    progress: Optional[ProgressCallback] = None
+) -> float:
+    """モデルを学習し、かかった時間(秒)を返す"""
+    started = time.perf_counter()
+    forecaster.fit(progress)
+    return time.perf_counter() - started
+
+
+class Forecaster(ABC):
+    """成長予測モデルの共通処理
+
+    fit() はCPU負荷が高いため、ワーカースレッドで呼び出すこと。
+    """
+
+    name: str = ""
+    chart_title: str = "Server Growth Prediction"
+    chart_size: Tuple[int, int] = (12, 8)
+    chart_fontsize: Optional[Dict[str, int]] = GRAPH_SETTINGS["fontsize"]
+    chart_grid_alpha: float = GRAPH_SETTINGS["alpha"]
+
+    def __init__(self, series: GrowthSeries, target: int) -> None:
+        self.series = series
+        self.target = target
+        # 予測曲線(日付序数, メンバー数)
+        self.forecast_x = np.zeros(0)
+        self.forecast_y = np.zeros(0)
+        self.score = 0.0
+
+    @abstractmethod
+    def fit(self, progress: Optional[ProgressCallback] = None) -> None:
+        """モデルを学習し予測曲線を求める"""
+
+    def details(self) -> Dict[str, str]:
+        """結果表示用の追加情報"""
+        return {}
+
+    def predict_target_date(self) -> Optional[datetime]:
+        """目標値に最初に到達する日を返す"""
+        reached = np.flatnonzero(self.forecast_y >= self.target)
+        if not len(reached):
+            return None
+        return datetime.fromordinal(int(self.forecast_x[reached[0]]))
+
+    def get_model_score(self) -> float:
+        return self.score
+
+    def chart_curve(self, target_date: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        """グラフに描く予測線"""
+        return self.forecast_x, self.forecast_y
+
+    def create_chart(
+        self,
+        target_date: datetime,
+        image_format: str = "png"
+    ) -> ChartRequest:
+        """予測グラフの内容を作成"""
+        chart = ChartRequest(
+            self.chart_title,
+            size=self.chart_size,
+            image_format=image_format,
+            fontsize=self.chart_fontsize,
+            grid_alpha=self.chart_grid_alpha
+        )
+
+        # 実データのプロット
+        chart.scatter(
+            self.series.ordinals,
+            self.series.counts,
+            color=GRAPH_SETTINGS["colors"]["actual"],
+            label="Actual Data",
+            alpha=GRAPH_SETTINGS["alpha"]
+        )
+
+        # 予測線のプロット
+        curve_x, curve_y = self.chart_curve(target_date)
+        chart.line(
+            curve_x,
+            curve_y,
+            color=GRAPH_SETTINGS["colors"]["prediction"],
+            label="Prediction",
+            linewidth=GRAPH_SETTINGS["linewidth"]
+        )
+
+        # 目標値と予測日の線
+        chart.hline(
+            self.target,
+            color=GRAPH_SETTINGS["colors"]["target"],
+            linestyle="--",
+            label=f"Target: {self.target}",
+            linewidth=GRAPH_SETTINGS["linewidth"]
+        )
+        chart.vline(
+            target_date,
+            color=GRAPH_SETTINGS["colors"]["date"],
+            linestyle="--",
+            label=f"Predicted: {target_date.date()}",
+            linewidth=GRAPH_SETTINGS["linewidth"]
+        )
+
+        return chart
+
+
+class GrowthPredictor(Forecaster):
+    """多項式回帰によるサーバー成長予測"""
+
+    name = "Polynomial"
+
+    def __init__(self, series: GrowthSeries, target: int) -> None:
+        super().__init__(series, target)
+        self.X = series.ordinals.reshape(-1, 1)
+        self.y = series.counts
+        self.poly = PolynomialFeatures(degree=POLYNOMIAL_DEGREE)
+        self.model = LinearRegression()
+
+    def fit(self, progress: Optional[ProgressCallback] = None) -> None:
+        _report(progress, "fitting")
+        X_poly = self.poly.fit_transform(self.X)
+        self.model.fit(X_poly, self.y)
+        self.score = self.model.score(X_poly, self.y)
+
+        _report(progress, "solving")
+        future_days = np.arange(
+            self.X[-1][0],
+            self.X[-1][0] + POLYNOMIAL_PREDICTION_DAYS
+        ).reshape(-1, 1)
+        self.forecast_x = future_days[:, 0]
+        self.forecast_y = self.model.predict(self.poly.transform(future_days))
+
+    def details(self) -> Dict[str, str]:
+        return {"予測モデル": f"{POLYNOMIAL_DEGREE}次多項式回帰"}
+
+    def chart_curve(self, target_date: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        X_plot = np.linspace(
+            self.X[0][0],
+            target_date.toordinal(),
+            200
+        ).reshape(-1, 1)
+        return X_plot[:, 0], self.model.predict(self.poly.transform(X_plot))
+
+
+class ArimaPredictor(Forecaster):
+    """ARIMAモデルによるサーバー成長予測"""
+
+    name = "ARIMA"
+    chart_title = "Server Growth Prediction (ARIMA)"
+    chart_size = (8, 5)
+    chart_fontsize = None
+    chart_grid_alpha = 0.7
+
+    def __init__(
+        self,
+        series: GrowthSeries,
+        target: int,
+        possible_orders: List[Tuple[int, int, int]] = ARIMA_ORDERS
+    ) -> None:
+        super().__init__(series, target)
+        self.possible_orders = possible_orders
+        self.best_order = possible_orders[0]
+        self.aic = float("inf")
+
+    def _fit_best_order(self, progress: Optional[ProgressCallback]) -> Any:
+        """AICが最小になるパラメータで学習したモデルを返す"""
+        # statsmodelsは読み込みが重いため使用時に読み込む
+        from statsmodels.tsa.arima.model import ARIMA
+
+        y = self.series.counts.astype(np.float64)
+        best_fit = None
+        for i, order in enumerate(self.possible_orders, 1):
+            _report(progress, "fitting", f"{i}/{len(self.possible_orders)}")
+            try:
+                temp_fit = ARIMA(y, order=order).fit()
+                if temp_fit.aic < self.aic:
+                    self.aic = temp_fit.aic
+                    self.best_order = order
+                    best_fit = temp_fit
+            except Exception as e:
+                logger.warning("Failed to fit ARIMA model with order %s: %s", order, e)
+                continue
+
+        if best_fit is None:
+            best_fit = ARIMA(y, order=self.best_order).fit()
+            self.aic = best_fit.aic
+        return best_fit
+
+    def fit(self, progress: Optional[ProgressCallback] = None) -> None:
+        model_fit = self._fit_best_order(progress)
+
+        # 差分の初期値は予測値を持たないため除外
+        y = self.series.counts
+        skip = min(self.best_order[1], len(y) - 1)
+        self.score = r2_score(y[skip:], np.asarray(model_fit.fittedvalues)[skip:])
+
+        _report(progress, "solving")
+        last_day = self.series.start_ordinal + len(self.series) - 1
+        self.forecast_y = np.asarray(model_fit.forecast(steps=ARIMA_FORECAST_DAYS))
+        self.forecast_x = np.arange(last_day + 1, last_day + 1 + len(self.forecast_y))
+
+    def details(self) -> Dict[str, str]:
+        return {
+            "最適パラメータ": str(self.best_order),
+            "AIC": f"{self.aic:.2f}",
+            "予測モデル": "ARIMA"
+        }
+
+
+class ProphetPredictor(Forecaster):
+    """Prophetによるサーバー成長予測"""
+
+    name = "Prophet"
+    chart_title = "Server Growth Prediction with Prophet"
+
+    def fit(self, progress: Optional[ProgressCallback] = None) -> None:
+        # Prophetは読み込みが重いため使用時に読み込む
+        import pandas as pd
+        from prophet import Prophet
+
+        _report(progress, "fitting")
+        df = pd.DataFrame({
+            "ds": pd.to_datetime(self.series.dates),
+            "y": self.series.counts
+        })
+        model = Prophet(
+            n_changepoints=PROPHET_CONFIG["n_changepoints"],
+            changepoint_prior_scale=PROPHET_CONFIG["changepoint_prior_scale"],
+            seasonality_mode=PROPHET_CONFIG["seasonality_mode"]
+        )
+
+        weekly = PROPHET_CONFIG["weekly_seasonality"]
+        model.add_seasonality(
+            name=weekly["name"],
+            period=weekly["period"],
+            fourier_order=weekly["fourier_order"]
+        )
+        model.fit(df)
+
+        _report(progress, "solving")
+        future = model.make_future_dataframe(periods=PROPHET_PREDICTION_DAYS)
+        forecast = model.predict(future)
+
+        yhat = forecast["yhat"].to_numpy()
+        self.score = r2_score(self.series.counts, yhat[:len(df)])
+        self.forecast_x = np.fromiter(
+            (d.toordinal() for d in forecast["ds"]),
+            dtype=np.int64,
+            count=len(forecast)
+        )
+        self.forecast_y = yhat
+
+    def details(self) -> Dict[str, str]:
+        return {"予測モデル": "Prophet"}
@@ -0,0 +1,292 @@
+import asyncio
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Final, Iterable, List, Optional, Set, Tuple
+import logging
+
+import aiosqlite
+import discord
+import numpy as np
+
+
+DB_PATH: Final[Path] = Path("data/growth.db")
+
+CREATE_TABLES_SQL: Final[Tuple[str, ...]] = (
+    """
+    CREATE TABLE IF NOT EXISTS member_daily (
+        guild_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        member_count INTEGER NOT NULL,
+        joins INTEGER NOT NULL DEFAULT 0,
+        leaves INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, day)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS backfilled_guilds (
+        guild_id INTEGER PRIMARY KEY,
+        backfilled_at TEXT NOT NULL
+    )
+    """
+)
+
+UPSERT_EVENTS_SQL: Final[str] = """
+INSERT INTO member_daily (guild_id, day, member_count, joins, leaves)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (guild_id, day) DO UPDATE SET
+    member_count = excluded.member_count,
+    joins = joins + excluded.joins,
+    leaves = leaves + excluded.leaves
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def today_ordinal() -> int:
+    """UTC基準の今日の日付(序数)"""
+    return datetime.now(timezone.utc).date().toordinal()
+
+
+class GrowthSeries:
+    """日次メンバー数の連続した時系列
+
+    start_ordinal日目から1日刻みで counts が並ぶ。記録のない日は直前の値で埋める。
+    """
+
+    def __init__(self, start_ordinal: int, counts: np.ndarray) -> None:
+        self.start_ordinal = start_ordinal
+        self.counts = counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, int]]) -> "GrowthSeries":
+        """(日付序数, メンバー数) の昇順の行から時系列を作成"""
+        rows = list(rows)
+        if not rows:
+            return cls(today_ordinal(), np.zeros(0, dtype=np.int64))
+
+        days = np.fromiter((day for day, _ in rows), dtype=np.int64, count=len(rows))
+        values = np.fromiter((count for _, count in rows), dtype=np.int64, count=len(rows))
+        start = int(days[0])
+
+        # 記録のない日を直前の値で埋める
+        index = np.zeros(int(days[-1]) - start + 1, dtype=np.int64)
+        index[days - start] = np.arange(len(days))
+        index = np.maximum.accumulate(index)
+        return cls(start, values[index])
+
+    @classmethod
+    def from_join_dates(cls, join_dates: Iterable[datetime]) -> "GrowthSeries":
+        """参加日時の一覧から累積メンバー数の時系列を作成"""
+        ordinals = np.fromiter(
+            (d.toordinal() for d in join_dates),
+            dtype=np.int64
+        )
+        if not len(ordinals):
+            return cls(today_ordinal(), np.zeros(0, dtype=np.int64))
+
+        start = int(ordinals.min())
+        daily = np.bincount(ordinals - start)
+        return cls(start, np.cumsum(daily))
+
+    def with_latest(self, day: int, count: int) -> "GrowthSeries":
+        """指定日の値を上書き(または末尾に追加)した時系列を返す"""
+        if not len(self.counts):
+            return GrowthSeries(day, np.array([count], dtype=np.int64))
+        if day < self.start_ordinal:
+            return self
+
+        end = self.start_ordinal + len(self.counts) - 1
+        if day > end:
+            pad = np.full(day - end, self.counts[-1], dtype=np.int64)
+            counts = np.concatenate([self.counts, pad])
+        else:
+            counts = self.counts.copy()
+        counts[day - self.start_ordinal] = count
+        return GrowthSeries(self.start_ordinal, counts)
+
+    @property
+    def ordinals(self) -> np.ndarray:
+        return np.arange(
+            self.start_ordinal,
+            self.start_ordinal + len(self.counts),
+            dtype=np.int64
+        )
+
+    @property
+    def dates(self) -> List[datetime]:
+        return [datetime.fromordinal(int(d)) for d in self.ordinals]
+
+    @property
+    def first_date(self) -> datetime:
+        return datetime.fromordinal(self.start_ordinal)
+
+    @property
+    def last_date(self) -> datetime:
+        return datetime.fromordinal(self.start_ordinal + len(self.counts) - 1)
+
+
+class GrowthStore:
+    """サーバーごとの日次メンバー数をSQLiteに記録する
+
+    補完済みのサーバーはメモリに覚え、補完はサーバーごとのロックで1回だけ行う。
+    コグ間でロックを共有するため、通常は get_store() の共有インスタンスを使う。
+    """
+
+    def __init__(self, db_path: Path = DB_PATH) -> None:
+        self.db_path = db_path
+        self._initialized = False
+        # (guild_id, day) -> [joins, leaves, member_count]
+        self._pending: Dict[Tuple[int, int], List[int]] = {}
+        self._backfilled: Set[int] = set()
+        self._backfill_locks: Dict[int, asyncio.Lock] = {}
+
+    async def init_db(self) -> None:
+        """DBを初期化"""
+        if self._initialized:
+            return
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        async with aiosqlite.connect(self.db_path) as db:
+            for sql in CREATE_TABLES_SQL:
+                await db.execute(sql)
+            await db.commit()
+            async with db.execute("SELECT guild_id FROM backfilled_guilds") as cursor:
+                self._backfilled.update([row[0] async for row in cursor])
+        self._initialized = True
+
+    def record_join(self, guild: discord.Guild) -> None:
+        """参加イベントをバッファに記録"""
+        self._record(guild, joins=1, leaves=0)
+
+    def record_leave(self, guild: discord.Guild) -> None:
+        """退出イベントをバッファに記録"""
+        self._record(guild, joins=0, leaves=1)
+
+    def _record(self, guild: discord.Guild, joins: int, leaves: int) -> None:
+        entry = self._pending.setdefault((guild.id, today_ordinal()), [0, 0, 0])
+        entry[0] += joins
+        entry[1] += leaves
+        entry[2] = guild.member_count or 0
+
+    async def flush(self) -> None:
+        """バッファされたイベントをDBに書き込む"""
+        if not self._pending:
+            return
+        await self.init_db()
+
+        pending, self._pending = self._pending, {}
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                UPSERT_EVENTS_SQL,
+                [
+                    (guild_id, day, count, joins, leaves)
+                    for (guild_id, day), (joins, leaves, count) in pending.items()
+                ]
+            )
+            await db.commit()
+
+    async def snapshot(self, guilds: Iterable[discord.Guild]) -> None:
+        """全サーバーの現在のメンバー数を記録"""
+        await self.flush()
+        day = today_ordinal()
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                UPSERT_EVENTS_SQL,
+                [
+                    (guild.id, day, guild.member_count or 0, 0, 0)
+                    for guild in guilds
+                ]
+            )
+            await db.commit()
+
+    async def ensure_backfilled(self, guild: discord.Guild) -> None:
+        """記録開始前の履歴を現在のメンバーの参加日から補完"""
+        await self.ensure_all_backfilled([guild])
+
+    async def ensure_all_backfilled(self, guilds: Iterable[discord.Guild]) -> None:
+        """未補完のサーバーの履歴を1つの接続でまとめて補完"""
+        await self.init_db()
+        missing = [guild for guild in guilds if guild.id not in self._backfilled]
+        if not missing:
+            return
+
+        async with aiosqlite.connect(self.db_path) as db:
+            for guild in missing:
+                lock = self._backfill_locks.setdefault(guild.id, asyncio.Lock())
+                async with lock:
+                    # ロックを待つ間に他の呼び出しが補完を終えていれば何もしない
+                    if guild.id in self._backfilled:
+                        continue
+                    await self._backfill(db, guild)
+                    self._backfilled.add(guild.id)
+
+    async def _backfill(self, db: aiosqlite.Connection, guild: discord.Guild) -> None:
+        series = GrowthSeries.from_join_dates(
+            m.joined_at for m in guild.members if m.joined_at
+        )
+        if len(series):
+            daily_joins = np.diff(series.counts, prepend=0)
+            # 実際に記録された行を優先する
+            await db.executemany(
+                """
+                INSERT OR IGNORE INTO member_daily
+                (guild_id, day, member_count, joins, leaves)
+                VALUES (?, ?, ?, ?, 0)
+                """,
+                [
+                    (guild.id, int(day), int(count), int(joins))
+                    for day, count, joins in zip(
+                        series.ordinals, series.counts, daily_joins
+                    )
+                    if joins
+                ]
+            )
+        await db.execute(
+            """
+            INSERT OR IGNORE INTO backfilled_guilds (guild_id, backfilled_at)
+            VALUES (?, ?)
+            """,
+            (guild.id, datetime.now(timezone.utc).isoformat())
+        )
+        await db.commit()
+        logger.info(
+            "Backfilled growth history for guild %s (%s days)",
+            guild.id, len(series)
+        )
+
+    async def get_series(
+        self,
+        guild: discord.Guild,
+        since: Optional[date] = None
+    ) -> GrowthSeries:
+        """サーバーの日次メンバー数の時系列を取得"""
+        await self.ensure_backfilled(guild)
+        start = since.toordinal() if since else 0
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                """
+                SELECT day, member_count FROM member_daily
+                WHERE guild_id = ? AND day >= ?
+                ORDER BY day
+                """,
+                (guild.id, start)
+            ) as cursor:
+                rows = await cursor.fetchall()
+
+        series = GrowthSeries.from_rows(rows)
+        if guild.member_count:
+            series = series.with_latest(today_ordinal(), guild.member_count)
+        return series
+
+
+_store: Optional[GrowthStore] = None
+
+
+def get_store() -> GrowthStore:
+    """全コグで共有するストアを取得(補完の状態とロックを1つにまとめる)"""
+    global _store
+    if _store is None:
+        _store = GrowthStore()
+    return _store
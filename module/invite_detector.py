@@ -0,0 +1,98 @@
+import re
+import unicodedata
+from typing import Final, List, Set
+
+
+INVITE_HOSTS: Final[Set[str]] = {
+    "discord.gg",
+    "discordapp.com/invite",
+    "discord.com/invite"
+}
+
+URL_SHORTENERS: Final[Set[str]] = {
+    "x.gd", "bit.ly", "tinyurl.com",
+    "goo.gl", "is.gd", "ow.ly",
+    "buff.ly", "00m.in"
+}
+
+# ゼロ幅文字・書式制御文字など、表示されずに文字列を分断できるもの
+_INVISIBLE: Final[re.Pattern] = re.compile(
+    "[\u00ad\u034f\u061c\u115f\u1160\u17b4\u17b5\u180e"
+    "\u200b-\u200f\u202a-\u202e\u2060-\u2064\u206a-\u206f\u3164\ufeff\uffa0]"
+)
+# "discord . gg" や "discord [.] gg"、"discord(dot)gg" のような区切りのごまかし
+# (空白や括弧を含むものだけに一致させ、普通のドットでは置き換えが起きないようにする)
+_DOT_SEPARATOR: Final[re.Pattern] = re.compile(
+    r"\s*[\[(]\s*(?:\.|dot)\s*[\])]\s*|\s+(?:\.|dot)\s*|\.\s+",
+    re.IGNORECASE
+)
+_SLASH_SEPARATOR: Final[re.Pattern] = re.compile(r"\s+/\s*|/\s+")
+# 上の2つが置き換えうる箇所の目印。どれも含まなければ正規表現を走らせない
+_SEPARATOR_HINTS: Final[tuple] = (" .", ". ", " /", "/ ", " d", " D", "(", "[")
+
+
+def _host_alternation(hosts: Set[str]) -> str:
+    return "|".join(re.escape(host) for host in sorted(hosts, key=len, reverse=True))
+
+
+# 招待リンクと短縮URLを1つの正規表現でまとめて検出する。
+# スキームや "www." は前に付いていてもよく、ホスト名の途中からは一致させない
+_DETECTOR: Final[re.Pattern] = re.compile(
+    r"(?:(?<![\w.-])|(?<=www\.))"
+    rf"(?:(?P<invite>{_host_alternation(INVITE_HOSTS)})/[\w-]"
+    rf"|(?P<short>{_host_alternation(URL_SHORTENERS)})/(?P<path>[^\s<>\"']+))",
+    re.IGNORECASE
+)
+# 正規化後に小文字化した本文がどれも含まなければ _DETECTOR は一致しない
+_HOST_KEYS: Final[tuple] = tuple(f"{host}/" for host in INVITE_HOSTS | URL_SHORTENERS)
+
+
+def normalize(text: str) -> str:
+    """検出用に正規化した文字列
+
+    全角文字を半角に(NFKC)、見えない文字を除去し、空白を半角スペース1つにそろえ、
+    ドットやスラッシュの周りの空白や (dot) 表記を詰める。短縮URLのパスは
+    大文字小文字を区別するので小文字化はしない。
+    """
+    if not text.isascii():
+        text = _INVISIBLE.sub("", unicodedata.normalize("NFKC", text))
+    text = " ".join(text.split())
+    if any(hint in text for hint in _SEPARATOR_HINTS):
+        text = _SLASH_SEPARATOR.sub("/", _DOT_SEPARATOR.sub(".", text))
+    return text
+
+
+class InviteScan:
+    """1つのメッセージの検査結果"""
+
+    def __init__(self, has_invite: bool, short_urls: List[str]) -> None:
+        self.has_invite = has_invite
+        self.short_urls = short_urls
+
+    def __bool__(self) -> bool:
+        return self.has_invite
+
+
+def scan(text: str) -> InviteScan:
+    """招待リンクの有無と、展開が必要な短縮URLを1回の走査で調べる"""
+    short_urls: List[str] = []
+    # どの形式もスラッシュ(全角を含む)を必要とするので、なければ正規化もしない
+    if "/" not in text and "／" not in text:
+        return InviteScan(False, short_urls)
+    text = normalize(text)
+    lowered = text.lower()
+    if not any(key in lowered for key in _HOST_KEYS):
+        return InviteScan(False, short_urls)
+
+    for match in _DETECTOR.finditer(text):
+        if match.group("invite"):
+            return InviteScan(True, [])
+        url = f"https://{match.group('short').lower()}/{match.group('path')}"
+        if url not in short_urls:
+            short_urls.append(url)
+    return InviteScan(False, short_urls)
+
+
+def is_invite_url(url: str) -> bool:
+    """展開後のURLなどが招待リンクかどうか"""
+    return scan(url).has_invite
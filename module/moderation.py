@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import Dict, Final, List, Optional, Set, Tuple
+import logging
+
+import discord
+
+
+BATCH_WINDOW: Final[float] = 1.0  # seconds, この間の検出をまとめて削除する
+WARNING_LIFETIME: Final[float] = 5.0  # seconds
+BULK_DELETE_LIMIT: Final[int] = 100  # Discord APIの一括削除の上限
+
+logger = logging.getLogger(__name__)
+
+class PurgeBatcher:
+    """削除対象のメッセージをチャンネルごとにまとめて一括削除する
+
+    BATCH_WINDOW の間に届いたメッセージは1回の一括削除で消し、警告は
+    チャンネルごとに1件だけ送る。警告は1つの掃除タスクが期限切れのものを
+    まとめて削除するので、警告ごとに待機するコルーチンは作らない。
+    """
+
+    def __init__(
+        self,
+        warning: str,
+        window: float = BATCH_WINDOW,
+        warning_lifetime: float = WARNING_LIFETIME
+    ) -> None:
+        self.warning = warning
+        self.window = window
+        self.warning_lifetime = warning_lifetime
+        self._pending: Dict[int, List[discord.Message]] = {}
+        # channel_id -> (警告メッセージ, 削除する時刻)
+        self._warnings: Dict[int, Tuple[discord.Message, float]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def submit(self, message: discord.Message) -> None:
+        """メッセージを削除待ちに追加する"""
+        channel_id = message.channel.id
+        if channel_id in self._pending:
+            self._pending[channel_id].append(message)
+            return
+        self._pending[channel_id] = [message]
+        self._spawn(self._flush_later(message.channel))
+
+    async def close(self) -> None:
+        """待機中のタスクを止め、残っている警告を削除する"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+        self._pending.clear()
+        warnings = [warning for warning, _ in self._warnings.values()]
+        self._warnings.clear()
+        await asyncio.gather(
+            *(self._delete_warning(warning) for warning in warnings),
+            return_exceptions=True
+        )
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_later(self, channel: discord.abc.Messageable) -> None:
+        await asyncio.sleep(self.window)
+        messages = self._pending.pop(channel.id, [])
+
+        for start in range(0, len(messages), BULK_DELETE_LIMIT):
+            chunk = messages[start:start + BULK_DELETE_LIMIT]
+            try:
+                # 1件だけのときは discord.py が通常の削除にしてくれる
+                await channel.delete_messages(chunk)
+            except discord.NotFound:
+                # 既に消えたものが混ざると一括削除は失敗するので1件ずつ消し直す
+                await asyncio.gather(
+                    *(message.delete() for message in chunk),
+                    return_exceptions=True
+                )
+            except discord.HTTPException as e:
+                logger.warning("Failed to purge %d messages in %s: %s", len(chunk), channel.id, e)
+
+        if messages and channel.id not in self._warnings:
+            await self._warn(channel)
+
+    async def _warn(self, channel: discord.abc.Messageable) -> None:
+        try:
+            warning = await channel.send(self.warning)
+        except discord.HTTPException:
+            return
+        self._warnings[channel.id] = (warning, time.monotonic() + self.warning_lifetime)
+        if not self._sweeper or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        """期限切れの警告を削除し、警告がなくなったら終了する"""
+        while self._warnings:
+            now = time.monotonic()
+            expired = [
+                channel_id for channel_id, (_, expires_at) in self._warnings.items()
+                if expires_at <= now
+            ]
+            if expired:
+                await asyncio.gather(
+                    *(self._delete_warning(self._warnings.pop(channel_id)[0]) for channel_id in expired),
+                    return_exceptions=True
+                )
+                continue
+            next_expiry = min(expires_at for _, expires_at in self._warnings.values())
+            await asyncio.sleep(next_expiry - now)
+
+    @staticmethod
+    async def _delete_warning(warning: discord.Message) -> None:
+        try:
+            await warning.delete()
+        except discord.HTTPException:
+            pass
@@ -0,0 +1,106 @@
+import io
+from typing import Final, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from module.workers import run_in_worker
+
+
+HASH_SIZE: Final[int] = 8
+# DCTをかける縮小画像の一辺(低周波成分の HASH_SIZE x HASH_SIZE を使う)
+DCT_SIZE: Final[int] = 32
+# 展開後の画素数の上限。圧縮率の高い小さなファイルが巨大な画像に展開されるのを防ぐ
+MAX_PIXELS: Final[int] = 40_000_000
+
+T = TypeVar("T")
+
+
+def phash(data: bytes) -> Optional[int]:
+    """画像の知覚ハッシュ(64bit)。画像として読めなければ None
+
+    縮小・再圧縮やわずかな加工では数ビットしか変わらない。
+    展開する前にヘッダーから大きさを読み、MAX_PIXELS を超える画像は扱わない。
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as header:
+            width, height = header.size
+    except (OSError, Image.DecompressionBombError):
+        return None
+    if width * height > MAX_PIXELS:
+        return None
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+    if image is None or image.size == 0:
+        return None
+    small = cv2.resize(image, (DCT_SIZE, DCT_SIZE), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(np.float32(small))[:HASH_SIZE, :HASH_SIZE]
+    # 直流成分は明るさだけを表すので中央値の計算から除く
+    median = np.median(low.flatten()[1:])
+    bits = (low > median).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+async def hash_image(data: bytes) -> Optional[int]:
+    """phash をワーカープールで計算する"""
+    return await run_in_worker(phash, data)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree(Generic[T]):
+    """ハミング距離で近いハッシュを探すためのBK木"""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self) -> None:
+        # ノードは (ハッシュ, 値, {距離: 子ノード})
+        self._root: Optional[Tuple[int, T, dict]] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, key: int, value: T) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = (key, value, {})
+            return
+        node = self._root
+        while True:
+            distance = hamming(key, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (key, value, {})
+                return
+            node = child
+
+    def search(self, key: int, max_distance: int) -> List[Tuple[int, T]]:
+        """max_distance 以内の (距離, 値) を近い順に返す"""
+        if self._root is None:
+            return []
+        results = []
+        stack = [self._root]
+        while stack:
+            node_key, value, children = stack.pop()
+            distance = hamming(key, node_key)
+            if distance <= max_distance:
+                results.append((distance, value))
+            # 三角不等式により、この範囲の子だけを調べればよい
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(
+                child for d, child in children.items() if low <= d <= high
+            )
+        results.sort(key=lambda item: item[0])
+        return results
+
+    def __iter__(self) -> Iterator[Tuple[int, T]]:
+        stack = [self._root] if self._root else []
+        while stack:
+            key, value, children = stack.pop()
+            yield key, value
+            stack.extend(children.values())
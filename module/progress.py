@@ -0,0 +1,136 @@
+import asyncio
+from typing import Dict, Final, Optional
+import logging
+
+import discord
+
+
+PROGRESS_MIN_INTERVAL: Final[float] = 2.0  # seconds
+PROGRESS_GRACE: Final[float] = 2.0  # seconds
+
+STAGE_LABELS: Final[Dict[str, str]] = {
+    "binning": "データを集計中",
+    "fitting": "モデルを学習中",
+    "solving": "予測日を計算中",
+    "rendering": "グラフを描画中"
+}
+
+logger = logging.getLogger(__name__)
+
+class ProgressReporter:
+    """処理の実際の進捗を表示する
+
+    defer(thinking=True) 済みなら「考え中」の元の応答を編集して表示し、
+    それ以外のときだけ別のフォローアップメッセージを送る。update() は
+    ワーカースレッドからも呼び出せる。表示の更新は PROGRESS_MIN_INTERVAL 秒に
+    1回までにまとめ、PROGRESS_GRACE 秒以内に終わった処理では何も送信しない。
+    結果は send() で送ると、先に進捗の表示を片付けてから送信する。
+    """
+
+    def __init__(
+        self,
+        interaction: discord.Interaction,
+        ephemeral: bool = True,
+        min_interval: float = PROGRESS_MIN_INTERVAL,
+        grace: float = PROGRESS_GRACE
+    ) -> None:
+        self.interaction = interaction
+        # 別のフォローアップを送るときだけ使う(元の応答の公開範囲は defer 時に決まる)
+        self.ephemeral = ephemeral
+        self.min_interval = min_interval
+        self.grace = grace
+        self._state: Optional[str] = None
+        self._shown: Optional[str] = None
+        self._edit_original = False
+        self._original_edited = False
+        self._message: Optional[discord.WebhookMessage] = None
+        self._sending: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, stage: str, detail: Optional[str] = None) -> None:
+        """現在の段階を記録(表示は次の更新タイミングで行う)"""
+        label = STAGE_LABELS.get(stage, stage)
+        if stage in STAGE_LABELS:
+            step = list(STAGE_LABELS).index(stage) + 1
+            label = f"[{step}/{len(STAGE_LABELS)}] {label}"
+        if detail:
+            label = f"{label} ({detail})"
+        # 文字列の代入はアトミックなのでロックは不要
+        self._state = label
+
+    async def __aenter__(self) -> "ProgressReporter":
+        self._edit_original = (
+            self.interaction.response.type
+            == discord.InteractionResponseType.deferred_channel_message
+        )
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.stop()
+
+    async def send(self, *args, **kwargs) -> None:
+        """進捗の表示を片付けてから結果をフォローアップで送る"""
+        await self.stop()
+        await self.interaction.followup.send(*args, **kwargs)
+
+    async def stop(self) -> None:
+        """進捗の更新を止めて表示を消す(何度呼んでもよい)"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # 送信中に止めた場合も、送信の完了を待ってから消す
+        if self._sending is not None:
+            try:
+                self._message = await self._sending
+            except discord.HTTPException:
+                pass
+            self._sending = None
+
+        try:
+            if self._message:
+                await self._message.delete()
+            elif self._original_edited:
+                # 編集済みの元の応答は後続のフォローアップに置き換わらないので消す
+                await self.interaction.delete_original_response()
+        except discord.HTTPException as e:
+            logger.warning("Failed to delete progress message: %s", e)
+        self._message = None
+        self._original_edited = False
+
+    async def _run(self) -> None:
+        await asyncio.sleep(self.grace)
+        while True:
+            state = self._state
+            if state is not None and state != self._shown:
+                try:
+                    await self._show(f"計算中... {state}")
+                    self._shown = state
+                except discord.HTTPException as e:
+                    logger.warning("Failed to update progress message: %s", e)
+            await asyncio.sleep(self.min_interval)
+
+    async def _show(self, content: str) -> None:
+        if self._edit_original:
+            # 編集が途中で取り消されても片付けられるよう、先に印を付ける
+            self._original_edited = True
+            await self.interaction.edit_original_response(content=content)
+        elif self._message is None:
+            if self._sending is None:
+                self._sending = asyncio.ensure_future(
+                    self.interaction.followup.send(
+                        content,
+                        ephemeral=self.ephemeral,
+                        wait=True
+                    )
+                )
+            # 取り消されても送信自体は続け、stop() で結果を受け取って削除する
+            self._message = await asyncio.shield(self._sending)
+            self._sending = None
+        else:
+            await self._message.edit(content=content)
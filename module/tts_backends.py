@@ -0,0 +1,138 @@
+import importlib.util
+import tempfile
+import time
+from abc import ABC, abstractmethod
+import wave
+from pathlib import Path
+from typing import AsyncIterator, Dict, Final, Optional
+import logging
+
+import edge_tts
+
+from module.workers import run_in_tts_worker
+
+
+EDGE_VOICE: Final[str] = "ja-JP-NanamiNeural"
+EDGE_RATE: Final[str] = "+0%"
+OPEN_JTALK_SPEED: Final[float] = 1.0
+
+logger = logging.getLogger(__name__)
+
+class TTSBackend(ABC):
+    """音声合成エンジンの共通インターフェース"""
+
+    name: str = ""
+    extension: str = "wav"
+    supports_streaming: bool = False
+    # このプロセス内で合成に使ったCPU時間(オンラインのエンジンでは0のまま)
+    cpu_seconds: float = 0.0
+
+    @property
+    @abstractmethod
+    def cache_voice(self) -> str:
+        """キャッシュキーに含める声の識別子"""
+
+    @property
+    @abstractmethod
+    def cache_rate(self) -> str:
+        """キャッシュキーに含める話速"""
+
+    def is_available(self) -> bool:
+        return True
+
+    @abstractmethod
+    async def synthesize(self, text: str, destination: Path) -> None:
+        """音声ファイルを destination に書き出す"""
+
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        """合成しながら音声データを順に返す
+
+        逐次合成できないエンジンでは、synthesize() で一時ファイルに書き出してから
+        まとめて返す(supports_streaming が False のときの既定の動作)。
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            destination = Path(directory) / f"stream.{self.extension}"
+            await self.synthesize(text, destination)
+            yield await run_in_tts_worker(destination.read_bytes)
+
+class EdgeTTSBackend(TTSBackend):
+    """Microsoft Edgeのオンライン音声合成"""
+
+    name = "edge"
+    extension = "mp3"
+    supports_streaming = True
+
+    def __init__(self, voice: str = EDGE_VOICE, rate: str = EDGE_RATE) -> None:
+        self.voice = voice
+        self.rate = rate
+
+    @property
+    def cache_voice(self) -> str:
+        return self.voice
+
+    @property
+    def cache_rate(self) -> str:
+        return self.rate
+
+    async def synthesize(self, text: str, destination: Path) -> None:
+        tts = edge_tts.Communicate(text, self.voice, rate=self.rate)
+        await tts.save(str(destination))
+
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        tts = edge_tts.Communicate(text, self.voice, rate=self.rate)
+        async for chunk in tts.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+class OpenJTalkBackend(TTSBackend):
+    """pyopenjtalkによるオフラインの日本語音声合成
+
+    ネットワークを使わないが、合成はCPUで行うので音声合成用のワーカープールで実行する。
+    pyopenjtalk が入っていない環境では利用できない。
+    """
+
+    name = "openjtalk"
+    extension = "wav"
+
+    def __init__(self, speed: float = OPEN_JTALK_SPEED) -> None:
+        self.speed = speed
+        self._available: Optional[bool] = None
+
+    @property
+    def cache_voice(self) -> str:
+        return "open_jtalk:mei_normal"
+
+    @property
+    def cache_rate(self) -> str:
+        return f"x{self.speed:g}"
+
+    def is_available(self) -> bool:
+        if self._available is None:
+            self._available = importlib.util.find_spec("pyopenjtalk") is not None
+            if not self._available:
+                logger.info("pyopenjtalk is not installed; offline TTS is disabled")
+        return self._available
+
+    async def synthesize(self, text: str, destination: Path) -> None:
+        await run_in_tts_worker(self._synthesize, text, destination)
+
+    def _synthesize(self, text: str, destination: Path) -> None:
+        import numpy as np
+        import pyopenjtalk
+
+        started = time.thread_time()
+        try:
+            audio, sample_rate = pyopenjtalk.tts(text, speed=self.speed)
+        finally:
+            self.cpu_seconds += time.thread_time() - started
+        samples = np.clip(audio, -32768, 32767).astype("<i2")
+        with wave.open(str(destination), "wb") as file:
+            file.setnchannels(1)
+            file.setsampwidth(2)
+            file.setframerate(sample_rate)
+            file.writeframes(samples.tobytes())
+
+def create_backends() -> Dict[str, TTSBackend]:
+    """利用できるエンジンを名前で引ける辞書"""
+    backends = [EdgeTTSBackend(), OpenJTalkBackend()]
+    return {backend.name: backend for backend in backends if backend.is_available()}
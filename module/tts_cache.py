@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Final, Optional, Tuple
+import logging
+
+import aiosqlite
+
+
+CACHE_DIR: Final[Path] = Path("data/tts_cache")
+CACHE_MAX_BYTES: Final[int] = 256 * 1024 * 1024
+# 使用記録(last_used, hits)はメモリにためて、この間隔か件数でまとめて書き込む
+USAGE_FLUSH_INTERVAL: Final[float] = 60.0  # seconds
+USAGE_FLUSH_SIZE: Final[int] = 256
+
+CREATE_TABLE_SQL: Final[str] = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+logger = logging.getLogger(__name__)
+
+class TTSCache:
+    """合成済み音声のディスクキャッシュ
+
+    (音声, 読み上げ速度, テキスト) の安定したダイジェストをキーにファイルを保存し、
+    合計サイズが上限を超えたら最後に使われたのが古いものから削除する。
+    ヒット時の使用順はメモリ上の索引だけで更新し、DBへはまとめて書き込む。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_DIR,
+        max_bytes: int = CACHE_MAX_BYTES
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._db: Optional[aiosqlite.Connection] = None
+        # key -> (filename, size)。先頭ほど最後に使われたのが古い
+        self._index: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        # key -> (最後に使われた時刻, 未反映のヒット数)
+        self._usage: Dict[str, Tuple[float, int]] = {}
+        self._last_flush = time.monotonic()
+        self._ready = False
+        self._init_lock = asyncio.Lock()
+
+    @staticmethod
+    def make_key(voice: str, text: str, rate: str) -> str:
+        """プロセスをまたいで同じ値になるキャッシュキー"""
+        return hashlib.sha256(f"{voice}\0{rate}\0{text}".encode("utf-8")).hexdigest()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    async def initialize(self) -> None:
+        """索引を読み込み、実体のないエントリを削除(2回目以降は何もしない)"""
+        if self._ready:
+            return
+        async with self._init_lock:
+            if not self._ready:
+                await self._load()
+
+    async def _load(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._db = await aiosqlite.connect(self.cache_dir / "index.db")
+        await self._db.execute(CREATE_TABLE_SQL)
+
+        missing = []
+        async with self._db.execute(
+            "SELECT key, filename, size FROM entries ORDER BY last_used"
+        ) as cursor:
+            async for key, filename, size in cursor:
+                if (self.cache_dir / filename).exists():
+                    self._index[key] = (filename, size)
+                    self._total_bytes += size
+                else:
+                    missing.append((key,))
+
+        if missing:
+            await self._db.executemany("DELETE FROM entries WHERE key = ?", missing)
+        await self._db.commit()
+        await self._evict()
+        self._ready = True
+        logger.info(
+            "TTS cache loaded: %s entries, %.1f MiB",
+            len(self._index), self._total_bytes / 2 ** 20
+        )
+
+    async def close(self) -> None:
+        if self._db:
+            try:
+                await self._flush_usage()
+                await self._db.commit()
+            finally:
+                await self._db.close()
+                self._db = None
+        self._ready = False
+
+    def temp_path(self, key: str, extension: str) -> Path:
+        """書き込み途中のファイルの置き場所"""
+        return self.cache_dir / f".{key}.{os.getpid()}.{extension}.tmp"
+
+    async def get(self, key: str) -> Optional[Path]:
+        """キャッシュ済みならパスを返し、使用記録を更新"""
+        await self.initialize()
+
+        entry = self._index.get(key)
+        if not entry:
+            return None
+
+        path = self.cache_dir / entry[0]
+        if not path.exists():
+            await self._remove(key)
+            await self._db.commit()
+            return None
+
+        self._index.move_to_end(key)
+        hits = self._usage[key][1] if key in self._usage else 0
+        self._usage[key] = (time.time(), hits + 1)
+        if (
+            len(self._usage) >= USAGE_FLUSH_SIZE
+            or time.monotonic() - self._last_flush >= USAGE_FLUSH_INTERVAL
+        ):
+            await self._flush_usage()
+            await self._db.commit()
+        return path
+
+    async def put(self, key: str, source: Path, extension: str) -> Path:
+        """書き込み済みのファイルをキャッシュに移動して登録"""
+        await self.initialize()
+
+        filename = f"{key[:2]}/{key}.{extension}"
+        path = self.cache_dir / filename
+        path.parent.mkdir(exist_ok=True)
+        os.replace(source, path)
+
+        if key in self._index:
+            self._total_bytes -= self._index.pop(key)[1]
+        size = path.stat().st_size
+        self._index[key] = (filename, size)
+        self._total_bytes += size
+
+        await self._db.execute(
+            """
+            INSERT OR REPLACE INTO entries (key, filename, size, last_used, hits)
+            VALUES (?, ?, ?, ?, 0)
+            """,
+            (key, filename, size, time.time())
+        )
+        self._usage.pop(key, None)
+        # 追加の commit はたまった使用記録と一緒に _evict() で行う
+        await self._evict()
+        return path
+
+    async def _flush_usage(self) -> None:
+        """メモリにためた使用記録をDBに書き込む(commit は呼び出し側で行う)"""
+        self._last_flush = time.monotonic()
+        if not self._usage:
+            return
+        usage, self._usage = self._usage, {}
+        await self._db.executemany(
+            "UPDATE entries SET last_used = ?, hits = hits + ? WHERE key = ?",
+            [(last_used, hits, key) for key, (last_used, hits) in usage.items()]
+        )
+
+    async def _remove(self, key: str) -> None:
+        self._usage.pop(key, None)
+        if entry := self._index.pop(key, None):
+            self._total_bytes -= entry[1]
+            try:
+                (self.cache_dir / entry[0]).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning("Failed to remove cached audio %s: %s", entry[0], e)
+        await self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    async def _evict(self) -> None:
+        """上限を超えた分を古いものから削除し、未反映の変更をコミット"""
+        evicted = 0
+        # 再起動後の使用順が索引と食い違わないよう、削除の前に反映しておく
+        await self._flush_usage()
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            await self._remove(key)
+            evicted += 1
+        await self._db.commit()
+        if evicted:
+            logger.debug("Evicted %s TTS cache entries", evicted)
@@ -0,0 +1,206 @@
+import asyncio
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Final, Iterable, Optional
+from urllib.parse import urljoin
+import logging
+
+import aiohttp
+import aiosqlite
+
+from module.invite_detector import is_invite_url
+
+
+DB_PATH: Final[Path] = Path("data/anti_invite.db")
+
+RESOLVE_TIMEOUT: Final[float] = 5.0  # seconds, 1つのURLの展開全体
+MAX_REDIRECTS: Final[int] = 5
+LIMIT_PER_HOST: Final[int] = 4
+CONNECTION_LIMIT: Final[int] = 32
+
+# 招待リンクだった短縮URLは長く、そうでなかったものは短めに覚えておく
+INVITE_TTL: Final[float] = 7 * 24 * 3600
+NOT_INVITE_TTL: Final[float] = 24 * 3600
+# 展開に失敗したものはメモリ上でだけ短時間覚え、同じURLの連投で何度も通信しない
+ERROR_TTL: Final[float] = 300
+MEMORY_CACHE_SIZE: Final[int] = 10_000
+
+REDIRECT_STATUSES: Final[frozenset] = frozenset({301, 302, 303, 307, 308})
+
+CREATE_TABLE_SQL: Final[str] = """
+CREATE TABLE IF NOT EXISTS url_cache (
+    url TEXT PRIMARY KEY,
+    is_invite INTEGER NOT NULL,
+    final_url TEXT,
+    expires_at REAL NOT NULL
+)
+"""
+
+logger = logging.getLogger(__name__)
+
+class ShortUrlResolver:
+    """短縮URLの展開先が招待リンクかを調べる
+
+    1つのメッセージのURLは並行に展開し、リダイレクトは1ホップずつ自分で辿って
+    MAX_REDIRECTS で打ち切る。結果は招待リンクかどうかに関わらずTTL付きで
+    メモリとSQLiteにキャッシュし、再起動後もすぐに判定できるようにする。
+    """
+
+    def __init__(self, db_path: Path = DB_PATH) -> None:
+        self.db_path = db_path
+        self._db: Optional[aiosqlite.Connection] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        # url -> (招待リンクか(None は失敗), 期限)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def initialize(self) -> None:
+        """キャッシュDBを開き、HTTPセッションを作る(DBが使えなくても展開はできる)"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._db = await aiosqlite.connect(self.db_path)
+            await self._db.execute(CREATE_TABLE_SQL)
+            await self._db.execute("DELETE FROM url_cache WHERE expires_at < ?", (time.time(),))
+            await self._db.commit()
+        except aiosqlite.Error as e:
+            logger.warning("URL cache database is unavailable: %s", e)
+            if self._db:
+                await self._db.close()
+                self._db = None
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=CONNECTION_LIMIT,
+                limit_per_host=LIMIT_PER_HOST
+            ),
+            timeout=aiohttp.ClientTimeout(total=RESOLVE_TIMEOUT)
+        )
+
+    async def close(self) -> None:
+        for task in self._inflight.values():
+            task.cancel()
+        if self._session:
+            await self._session.close()
+            self._session = None
+        if self._db:
+            await self._db.close()
+            self._db = None
+
+    async def any_invite(self, urls: Iterable[str]) -> bool:
+        """いずれかのURLの展開先が招待リンクか(見つかった時点で残りは待たない)"""
+        tasks = [asyncio.ensure_future(self.is_invite(url)) for url in urls]
+        try:
+            for future in asyncio.as_completed(tasks):
+                if await future:
+                    return True
+            return False
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def is_invite(self, url: str) -> Optional[bool]:
+        """招待リンクなら True、違えば False、展開できなければ None"""
+        if not self._session:
+            await self.initialize()
+
+        cached = self._memory.get(url)
+        if cached and cached[1] > time.time():
+            self._memory.move_to_end(url)
+            return cached[0]
+
+        # 同じURLの展開が進行中なら、その結果を待つ
+        if not (task := self._inflight.get(url)):
+            task = asyncio.create_task(self._lookup(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _lookup(self, url: str) -> Optional[bool]:
+        if row := await self._load(url):
+            self._remember(url, bool(row[0]), row[1])
+            return bool(row[0])
+
+        try:
+            final_url = await self._resolve(url)
+        except Exception as e:
+            logger.debug("Failed to resolve %s: %s", url, e)
+            self._remember(url, None, time.time() + ERROR_TTL)
+            return None
+
+        is_invite = is_invite_url(final_url)
+        expires_at = time.time() + (INVITE_TTL if is_invite else NOT_INVITE_TTL)
+        self._remember(url, is_invite, expires_at)
+        await self._store(url, is_invite, final_url, expires_at)
+        return is_invite
+
+    async def _load(self, url: str) -> Optional[tuple]:
+        """DBにキャッシュされた (招待リンクか, 期限)。DBの失敗は未キャッシュとして扱う"""
+        if not self._db:
+            return None
+        try:
+            async with self._db.execute(
+                "SELECT is_invite, expires_at FROM url_cache WHERE url = ? AND expires_at > ?",
+                (url, time.time())
+            ) as cursor:
+                return await cursor.fetchone()
+        except aiosqlite.Error as e:
+            logger.warning("Failed to read URL cache for %s: %s", url, e)
+            return None
+
+    async def _store(
+        self,
+        url: str,
+        is_invite: bool,
+        final_url: str,
+        expires_at: float
+    ) -> None:
+        """展開結果をDBに保存(失敗してもメモリのキャッシュは使える)"""
+        if not self._db:
+            return
+        try:
+            await self._db.execute(
+                """
+                INSERT OR REPLACE INTO url_cache (url, is_invite, final_url, expires_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (url, int(is_invite), final_url, expires_at)
+            )
+            await self._db.commit()
+        except aiosqlite.Error as e:
+            logger.warning("Failed to write URL cache for %s: %s", url, e)
+
+    async def _resolve(self, url: str) -> str:
+        """リダイレクトを1ホップずつ辿り、招待リンクか最終的なURLを返す"""
+        async with asyncio.timeout(RESOLVE_TIMEOUT):
+            for _ in range(MAX_REDIRECTS):
+                location = await self._next_location(url)
+                if location is None:
+                    return url
+                url = urljoin(url, location)
+                if is_invite_url(url):
+                    return url
+        return url
+
+    async def _next_location(self, url: str) -> Optional[str]:
+        """1回だけリクエストし、リダイレクト先があれば返す(本文は読まない)"""
+        try:
+            async with self._session.head(url, allow_redirects=False) as response:
+                if response.status != 405:
+                    return self._location(response)
+        except aiohttp.ClientError:
+            pass
+        # HEADに対応していないサーバーにはGETで聞き直す
+        async with self._session.get(url, allow_redirects=False) as response:
+            return self._location(response)
+
+    @staticmethod
+    def _location(response: aiohttp.ClientResponse) -> Optional[str]:
+        if response.status in REDIRECT_STATUSES:
+            return response.headers.get("Location")
+        return None
+
+    def _remember(self, url: str, is_invite: Optional[bool], expires_at: float) -> None:
+        self._memory[url] = (is_invite, expires_at)
+        self._memory.move_to_end(url)
+        while len(self._memory) > MEMORY_CACHE_SIZE:
+            self._memory.popitem(last=False)
@@ -0,0 +1,179 @@
+from pathlib import Path
+from typing import Dict, Final, Optional
+import logging
+
+import aiosqlite
+
+
+DB_PATH: Final[Path] = Path("data/voice.db")
+
+MAX_DEPTH_LIMIT: Final[int] = 50
+# 読み上げキューの既定の方針。従来どおり間引かず(件数は上限まで)、
+# 期限切れやまとめ読みは /vc-backlog で有効にしたサーバーだけで行う
+DEFAULT_MAX_DEPTH: Final[int] = MAX_DEPTH_LIMIT
+DEFAULT_MAX_AGE: Final[int] = 0  # seconds, 0で無効
+DEFAULT_MERGE_WINDOW: Final[int] = 0  # seconds, 0で無効
+DEFAULT_COLLAPSE_ANNOUNCEMENTS: Final[bool] = False
+DEFAULT_ENGINE: Final[str] = "auto"
+
+CREATE_TABLES_SQL: Final[str] = """
+CREATE TABLE IF NOT EXISTS backlog_policy (
+    guild_id INTEGER PRIMARY KEY,
+    max_depth INTEGER NOT NULL,
+    max_age INTEGER NOT NULL,
+    merge_window INTEGER NOT NULL,
+    collapse_announcements INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tts_engine (
+    guild_id INTEGER PRIMARY KEY,
+    engine TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reading_dictionary (
+    guild_id INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    reading TEXT NOT NULL,
+    PRIMARY KEY (guild_id, word)
+) WITHOUT ROWID;
+"""
+
+logger = logging.getLogger(__name__)
+
+class BacklogPolicy:
+    """読み上げが溜まったときの間引き方"""
+
+    def __init__(
+        self,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        max_age: int = DEFAULT_MAX_AGE,
+        merge_window: int = DEFAULT_MERGE_WINDOW,
+        collapse_announcements: bool = DEFAULT_COLLAPSE_ANNOUNCEMENTS
+    ) -> None:
+        self.max_depth = max(1, min(max_depth, MAX_DEPTH_LIMIT))
+        self.max_age = max(0, max_age)
+        self.merge_window = max(0, merge_window)
+        self.collapse_announcements = collapse_announcements
+
+    def replace(self, **changes: Optional[object]) -> "BacklogPolicy":
+        """None以外の値だけを差し替えた新しい方針"""
+        values = {
+            "max_depth": self.max_depth,
+            "max_age": self.max_age,
+            "merge_window": self.merge_window,
+            "collapse_announcements": self.collapse_announcements
+        }
+        values.update({k: v for k, v in changes.items() if v is not None})
+        return BacklogPolicy(**values)
+
+class VoiceSettingsStore:
+    """ギルドごとの読み上げ設定"""
+
+    def __init__(self, db_path: Path = DB_PATH) -> None:
+        self.db_path = db_path
+        self._db: Optional[aiosqlite.Connection] = None
+        self._policies: Dict[int, BacklogPolicy] = {}
+        self._engines: Dict[int, str] = {}
+        self._readings: Dict[int, Dict[str, str]] = {}
+        # 辞書を変更するたびに増やし、利用側のキャッシュの無効化に使う
+        self._reading_versions: Dict[int, int] = {}
+
+    async def initialize(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = await aiosqlite.connect(self.db_path)
+        await self._db.executescript(CREATE_TABLES_SQL)
+        await self._db.commit()
+
+        async with self._db.execute(
+            """
+            SELECT guild_id, max_depth, max_age, merge_window, collapse_announcements
+            FROM backlog_policy
+            """
+        ) as cursor:
+            async for guild_id, max_depth, max_age, merge_window, collapse in cursor:
+                self._policies[guild_id] = BacklogPolicy(
+                    max_depth, max_age, merge_window, bool(collapse)
+                )
+        async with self._db.execute("SELECT guild_id, engine FROM tts_engine") as cursor:
+            async for guild_id, engine in cursor:
+                self._engines[guild_id] = engine
+        async with self._db.execute(
+            "SELECT guild_id, word, reading FROM reading_dictionary"
+        ) as cursor:
+            async for guild_id, word, reading in cursor:
+                self._readings.setdefault(guild_id, {})[word] = reading
+        logger.info(
+            "Loaded voice settings: %s backlog policies, %s engines, %s dictionaries",
+            len(self._policies), len(self._engines), len(self._readings)
+        )
+
+    async def close(self) -> None:
+        if self._db:
+            await self._db.close()
+            self._db = None
+
+    def get_policy(self, guild_id: int) -> BacklogPolicy:
+        return self._policies.get(guild_id) or BacklogPolicy()
+
+    async def set_policy(self, guild_id: int, policy: BacklogPolicy) -> None:
+        await self._db.execute(
+            """
+            INSERT OR REPLACE INTO backlog_policy
+            (guild_id, max_depth, max_age, merge_window, collapse_announcements)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                guild_id,
+                policy.max_depth,
+                policy.max_age,
+                policy.merge_window,
+                int(policy.collapse_announcements)
+            )
+        )
+        await self._db.commit()
+        self._policies[guild_id] = policy
+
+    def get_engine(self, guild_id: int) -> str:
+        return self._engines.get(guild_id, DEFAULT_ENGINE)
+
+    async def set_engine(self, guild_id: int, engine: str) -> None:
+        await self._db.execute(
+            "INSERT OR REPLACE INTO tts_engine (guild_id, engine) VALUES (?, ?)",
+            (guild_id, engine)
+        )
+        await self._db.commit()
+        self._engines[guild_id] = engine
+
+    def get_readings(self, guild_id: int) -> Dict[str, str]:
+        return self._readings.get(guild_id, {})
+
+    def get_reading_version(self, guild_id: int) -> int:
+        return self._reading_versions.get(guild_id, 0)
+
+    async def set_reading(self, guild_id: int, word: str, reading: str) -> None:
+        await self._db.execute(
+            """
+            INSERT OR REPLACE INTO reading_dictionary (guild_id, word, reading)
+            VALUES (?, ?, ?)
+            """,
+            (guild_id, word, reading)
+        )
+        await self._db.commit()
+        self._readings.setdefault(guild_id, {})[word] = reading
+        self._bump_reading_version(guild_id)
+
+    async def remove_reading(self, guild_id: int, word: str) -> bool:
+        """単語を削除し、登録されていたかを返す"""
+        if word not in self._readings.get(guild_id, {}):
+            return False
+        await self._db.execute(
+            "DELETE FROM reading_dictionary WHERE guild_id = ? AND word = ?",
+            (guild_id, word)
+        )
+        await self._db.commit()
+        del self._readings[guild_id][word]
+        if not self._readings[guild_id]:
+            del self._readings[guild_id]
+        self._bump_reading_version(guild_id)
+        return True
+
+    def _bump_reading_version(self, guild_id: int) -> None:
+        self._reading_versions[guild_id] = self.get_reading_version(guild_id) + 1
@@ -0,0 +1,52 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Final, Optional, TypeVar
+
+
+WORKER_COUNT: Final[int] = min(4, os.cpu_count() or 1)
+# 音声合成は遅延が重要なので、予測モデルの学習などとは別のプールで動かす
+TTS_WORKER_COUNT: Final[int] = 2
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_tts_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """CPU負荷の高い処理用の共有ワーカープールを取得"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=WORKER_COUNT,
+            thread_name_prefix="swiftly-worker"
+        )
+    return _executor
+
+
+def get_tts_executor() -> ThreadPoolExecutor:
+    """音声合成専用のワーカープールを取得"""
+    global _tts_executor
+    if _tts_executor is None:
+        _tts_executor = ThreadPoolExecutor(
+            max_workers=TTS_WORKER_COUNT,
+            thread_name_prefix="swiftly-tts"
+        )
+    return _tts_executor
+
+
+async def _run(executor: Executor, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_in_worker(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """関数をワーカープールで実行し、結果を待つ"""
+    return await _run(get_executor(), func, *args, **kwargs)
+
+
+async def run_in_tts_worker(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """関数を音声合成用のワーカープールで実行し、結果を待つ"""
+    return await _run(get_tts_executor(), func, *args, **kwargs)
@@ -0,0 +1,252 @@
+"""成長予測モデルのバックテスト・計測ツール
+
+合成した参加履歴の末尾を隠して各モデルで予測し、計算時間・メモリ・予測日の誤差を測る。
+参加者は日ごとに集計してからモデルに渡すので、モデルの計算量を決めるのは履歴の日数
+(--days)で、メンバー数(--sizes)が効くのは集計(bin)の時間と曲線のなめらかさだけ。
+
+    python -m tools.growth_benchmark
+    python -m tools.growth_benchmark --days 90 730 --models Polynomial ARIMA
+    python -m tools.growth_benchmark --json result.json --baseline previous.json
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Final, List, Optional
+
+import numpy as np
+
+from module.forecast import (
+    ArimaPredictor,
+    Forecaster,
+    GrowthPredictor,
+    ProphetPredictor,
+    fit_timed
+)
+from module.growth_store import GrowthSeries
+
+
+DEFAULT_SIZES: Final[List[int]] = [1_000, 100_000]
+DEFAULT_DAYS: Final[List[int]] = [90, 365, 730, 1825]
+# history_days を記録する前の結果は、この日数の履歴で測ったもの
+LEGACY_HISTORY_DAYS: Final[int] = 730
+HOLDOUT_FRACTION: Final[float] = 0.2
+START_DATE: Final[datetime] = datetime(2023, 1, 1)
+# 回帰とみなす閾値
+TIME_TOLERANCE: Final[float] = 1.5  # 倍
+ERROR_TOLERANCE: Final[int] = 14  # 日
+
+MODELS: Final[Dict[str, Callable[[GrowthSeries, int], Forecaster]]] = {
+    "Polynomial": GrowthPredictor,
+    "ARIMA": ArimaPredictor,
+    "Prophet": ProphetPredictor
+}
+
+
+def _linear(t: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    return t
+
+
+def _exponential(t: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    return np.expm1(4 * t)
+
+
+def _plateau(t: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    return 1 / (1 + np.exp(-12 * (t - 0.35)))
+
+
+def _bursty(t: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    # 緩やかな流入に、数日間の急増を数回重ねる
+    rate = np.full(len(t), 1.0)
+    for center in rng.uniform(0.05, 0.95, size=6):
+        rate += 40 * np.exp(-((t - center) * len(t) / 3) ** 2)
+    return np.cumsum(rate)
+
+
+SHAPES: Final[Dict[str, Callable[[np.ndarray, np.random.Generator], np.ndarray]]] = {
+    "linear": _linear,
+    "exponential": _exponential,
+    "plateau": _plateau,
+    "bursty": _bursty
+}
+
+
+def generate_join_dates(
+    shape: str,
+    members: int,
+    rng: np.random.Generator,
+    days: int
+) -> List[datetime]:
+    """累積曲線の形に従う参加日時を生成"""
+    t = np.linspace(0, 1, days + 1)
+    cumulative = SHAPES[shape](t, rng).astype(np.float64)
+    cumulative = (cumulative - cumulative[0]) / (cumulative[-1] - cumulative[0])
+
+    # 累積分布の逆関数で参加時刻を求める
+    seconds = np.interp(np.sort(rng.random(members)), cumulative, t) * days * 86400
+    return [START_DATE + timedelta(seconds=float(s)) for s in seconds]
+
+
+def holdout(series: GrowthSeries) -> tuple:
+    """末尾を隠した学習用の時系列と、隠した区間の目標値・到達日を返す"""
+    cutoff = max(2, int(len(series) * (1 - HOLDOUT_FRACTION)))
+    train = GrowthSeries(series.start_ordinal, series.counts[:cutoff])
+    target = int(series.counts[-1])
+    reached = int(np.flatnonzero(series.counts >= target)[0])
+    return train, target, datetime.fromordinal(series.start_ordinal + reached)
+
+
+def run_case(
+    model: str,
+    train: GrowthSeries,
+    target: int,
+    actual_date: datetime,
+    measure_memory: bool
+) -> Dict[str, object]:
+    forecaster = MODELS[model](train, target)
+    if measure_memory:
+        tracemalloc.start()
+    try:
+        elapsed = fit_timed(forecaster)
+        peak = tracemalloc.get_traced_memory()[1] if measure_memory else None
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
+
+    predicted = forecaster.predict_target_date()
+    return {
+        "fit_seconds": round(elapsed, 4),
+        "peak_mib": round(peak / 2 ** 20, 2) if peak is not None else None,
+        "predicted": predicted.date().isoformat() if predicted else None,
+        "error_days": (predicted - actual_date).days if predicted else None,
+        "score": round(forecaster.get_model_score(), 4)
+    }
+
+
+def run(
+    sizes: List[int],
+    days_list: List[int],
+    shapes: List[str],
+    models: List[str],
+    seed: int,
+    measure_memory: bool
+) -> List[Dict[str, object]]:
+    results = []
+    for shape in shapes:
+        for days, size in itertools.product(days_list, sizes):
+            rng = np.random.default_rng(seed)
+            join_dates = generate_join_dates(shape, size, rng, days)
+
+            started = time.perf_counter()
+            series = GrowthSeries.from_join_dates(join_dates)
+            binning = time.perf_counter() - started
+            train, target, actual_date = holdout(series)
+
+            for model in models:
+                case = {
+                    "shape": shape,
+                    "members": size,
+                    "history_days": days,
+                    "model": model,
+                    "days": len(train),
+                    "binning_seconds": round(binning, 4),
+                    "actual": actual_date.date().isoformat()
+                }
+                try:
+                    case.update(run_case(model, train, target, actual_date, measure_memory))
+                except Exception as e:
+                    case["error"] = f"{type(e).__name__}: {e}"
+                results.append(case)
+                print(format_row(case), flush=True)
+    return results
+
+
+def format_row(case: Dict[str, object]) -> str:
+    if "error" in case:
+        detail = f"failed ({case['error']})"
+    else:
+        error = case["error_days"]
+        memory = case["peak_mib"]
+        detail = (
+            f"fit {case['fit_seconds']:>8.3f}s  "
+            f"mem {'-' if memory is None else f'{memory:.1f}MiB':>9}  "
+            f"error {'not reached' if error is None else f'{error:+d}d':>11}  "
+            f"R^2 {case['score']:.3f}"
+        )
+    return (
+        f"{case['shape']:<11} {case['history_days']:>5}d {case['members']:>9,} {case['model']:<10} "
+        f"bin {case['binning_seconds']:>7.3f}s  {detail}"
+    )
+
+
+def find_regressions(
+    results: List[Dict[str, object]],
+    baseline: List[Dict[str, object]]
+) -> List[str]:
+    """前回の結果と比べて遅くなった・精度が落ちたケースを列挙"""
+    def case_key(case: Dict[str, object]) -> tuple:
+        return (
+            case["shape"],
+            case.get("history_days", LEGACY_HISTORY_DAYS),
+            case["members"],
+            case["model"]
+        )
+
+    previous = {case_key(c): c for c in baseline}
+    regressions = []
+    for case in results:
+        before = previous.get(case_key(case))
+        if not before or "error" in before:
+            continue
+        name = f"{case['shape']}/{case['history_days']}d/{case['members']}/{case['model']}"
+        if "error" in case:
+            regressions.append(f"{name}: failed ({case['error']})")
+            continue
+        if case["fit_seconds"] > before["fit_seconds"] * TIME_TOLERANCE:
+            regressions.append(
+                f"{name}: fit {before['fit_seconds']}s -> {case['fit_seconds']}s"
+            )
+        if before["error_days"] is not None and (
+            case["error_days"] is None
+            or abs(case["error_days"]) > abs(before["error_days"]) + ERROR_TOLERANCE
+        ):
+            regressions.append(
+                f"{name}: error {before['error_days']}d -> {case['error_days']}d"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--days", type=int, nargs="+", default=DEFAULT_DAYS, help="履歴の日数")
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES), default=list(SHAPES))
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="メモリ計測を省略して高速に実行")
+    parser.add_argument("--json", type=Path, help="結果をJSONで保存するパス")
+    parser.add_argument("--baseline", type=Path, help="比較する前回のJSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.days, args.shapes, args.models, args.seed, not args.no_memory)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if regressions := find_regressions(results, baseline):
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
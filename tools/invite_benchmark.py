@@ -0,0 +1,145 @@
+"""招待リンク検出の処理速度・検出率の計測ツール
+
+通常の会話を中心とした合成メッセージ列に対し、以前の実装(パターンごとの小文字化と
+URLの抽出)と module.invite_detector の1回の走査を比べる。短縮URLの展開(通信)は含めない。
+
+    python -m tools.invite_benchmark
+    python -m tools.invite_benchmark --messages 500000 --json result.json
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Final, List, Optional
+from urllib.parse import urlparse
+
+from module.invite_detector import INVITE_HOSTS, URL_SHORTENERS, scan
+
+
+LEGACY_INVITE_PATTERNS: Final[List[str]] = [f"{host}/" for host in INVITE_HOSTS]
+
+CHAT: Final[List[str]] = [
+    "おはようございます",
+    "今日のイベント何時からだっけ？",
+    "それな",
+    "https://example.com/articles/12345 これ面白かった",
+    "画像見て！ https://cdn.discordapp.com/attachments/1/2/image.png",
+    "明日は雨らしいから気をつけて。傘忘れずに",
+    "lol that's so true",
+    "このゲームのアプデいつ来るんだろう。待ちきれない…",
+    "<@123456789012345678> 見てる？",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+]
+
+PLAIN_INVITES: Final[List[str]] = [
+    "join us discord.gg/abcdef",
+    "https://discord.com/invite/xyz123",
+    "おいで https://discordapp.com/invite/qwerty",
+]
+
+SHORTENED: Final[List[str]] = [
+    "check this https://bit.ly/3AbCdEf",
+    "http://tinyurl.com/y3k4m5n6",
+]
+
+EVASIONS: Final[List[str]] = [
+    "discord . gg / abcdef",
+    "ｄｉｓｃｏｒｄ．ｇｇ／ａｂｃｄｅｆ",
+    "disc\u200bord.gg/abcdef",
+    "discord[.]gg/abcdef",
+    "discord(dot)gg/abcdef",
+    "DISCORD.GG/ABCDEF",
+    "discord\u2060.gg/abcdef",
+]
+
+
+def legacy_scan(content: str) -> bool:
+    """以前の contains_invite のうち通信を除いた部分"""
+    if any(pattern in content.lower() for pattern in LEGACY_INVITE_PATTERNS):
+        return True
+    for url in re.findall(r"(https?://\S+)", content):
+        hostname = urlparse(url).hostname
+        if hostname and hostname.lower() in URL_SHORTENERS:
+            pass  # ここで1件ずつ展開していた
+    return False
+
+
+def current_scan(content: str) -> bool:
+    return scan(content).has_invite
+
+
+DETECTORS: Final[Dict[str, Callable[[str], bool]]] = {
+    "legacy": legacy_scan,
+    "compiled": current_scan
+}
+
+
+def generate_messages(count: int, spam_ratio: float, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    spam = PLAIN_INVITES + SHORTENED + EVASIONS
+    return [
+        rng.choice(spam) if rng.random() < spam_ratio else rng.choice(CHAT)
+        for _ in range(count)
+    ]
+
+
+def measure(detector: Callable[[str], bool], messages: List[str]) -> Dict[str, float]:
+    started = time.perf_counter()
+    hits = sum(1 for message in messages if detector(message))
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 4),
+        "messages_per_second": round(len(messages) / elapsed),
+        "hits": hits
+    }
+
+
+def detection_rates() -> Dict[str, Dict[str, str]]:
+    """種類ごとに何件検出できたか"""
+    groups = {"plain": PLAIN_INVITES, "evasion": EVASIONS, "chat": CHAT}
+    return {
+        name: {
+            group: f"{sum(map(detector, samples))}/{len(samples)}"
+            for group, samples in groups.items()
+        }
+        for name, detector in DETECTORS.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--spam-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="結果をJSONで保存するパス")
+    args = parser.parse_args(argv)
+
+    messages = generate_messages(args.messages, args.spam_ratio, args.seed)
+    results: Dict[str, object] = {
+        "messages": len(messages),
+        "throughput": {},
+        "detection": detection_rates()
+    }
+    for name, detector in DETECTORS.items():
+        case = measure(detector, messages)
+        results["throughput"][name] = case
+        print(
+            f"{name:<9} {case['messages_per_second']:>10,} msg/s  "
+            f"{case['seconds']:>8.3f}s  hits {case['hits']:,}",
+            flush=True
+        )
+
+    print("\nDetected (plain / evasion / false positives in chat):")
+    for name, rates in results["detection"].items():
+        print(f"{name:<9} {rates['plain']:>5}  {rates['evasion']:>5}  {rates['chat']:>5}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""読み上げエンジンの遅延・CPU時間の計測ツール
+
+各エンジンで同じ文を合成し、合成完了までの時間、最初の音声データまでの時間
+(ストリーミング対応のエンジンのみ)、プロセスのCPU時間を測る。
+
+    python -m tools.tts_benchmark
+    python -m tools.tts_benchmark --backends openjtalk --repeat 5 --json result.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Final, List, Optional
+
+from module.tts_backends import TTSBackend, create_backends
+
+
+PHRASES: Final[List[str]] = [
+    "こんにちは",
+    "Aさんが参加しました。",
+    "今日の夜は九時からボイスチャンネルで集まりましょう。",
+    "画像を3枚送信しました。URL省略",
+    "このメッセージは読み上げの遅延を測るための少し長めの文章です。句読点や数字の123も含みます。"
+]
+
+
+async def measure_synthesis(
+    backend: TTSBackend,
+    text: str,
+    directory: Path
+) -> Dict[str, float]:
+    destination = directory / f"sample.{backend.extension}"
+    cpu = time.process_time()
+    started = time.perf_counter()
+    await backend.synthesize(text, destination)
+    return {
+        "seconds": time.perf_counter() - started,
+        "cpu_seconds": time.process_time() - cpu,
+        "bytes": destination.stat().st_size
+    }
+
+
+async def measure_first_chunk(backend: TTSBackend, text: str) -> float:
+    started = time.perf_counter()
+    async for _ in backend.stream(text):
+        return time.perf_counter() - started
+    raise RuntimeError("no audio received")
+
+
+async def run(
+    backends: Dict[str, TTSBackend],
+    repeat: int
+) -> List[Dict[str, object]]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, backend in backends.items():
+            samples = []
+            first_chunks = []
+            errors = 0
+            for _ in range(repeat):
+                for text in PHRASES:
+                    try:
+                        samples.append(
+                            await measure_synthesis(backend, text, Path(directory))
+                        )
+                        if backend.supports_streaming:
+                            first_chunks.append(await measure_first_chunk(backend, text))
+                    except Exception as e:
+                        errors += 1
+                        print(f"{name}: {type(e).__name__}: {e}", file=sys.stderr)
+
+            case = {"backend": name, "runs": len(samples), "errors": errors}
+            if samples:
+                seconds = [s["seconds"] for s in samples]
+                case.update({
+                    "median_seconds": round(statistics.median(seconds), 4),
+                    "max_seconds": round(max(seconds), 4),
+                    "cpu_seconds_per_run": round(
+                        sum(s["cpu_seconds"] for s in samples) / len(samples), 4
+                    ),
+                    "median_first_chunk_seconds": (
+                        round(statistics.median(first_chunks), 4)
+                        if first_chunks else None
+                    ),
+                    "mean_bytes": int(sum(s["bytes"] for s in samples) / len(samples))
+                })
+            results.append(case)
+            print(format_row(case), flush=True)
+    return results
+
+
+def format_row(case: Dict[str, object]) -> str:
+    if not case["runs"]:
+        return f"{case['backend']:<10} failed ({case['errors']} errors)"
+    first_chunk = case["median_first_chunk_seconds"]
+    return (
+        f"{case['backend']:<10} "
+        f"median {case['median_seconds']:>7.3f}s  "
+        f"max {case['max_seconds']:>7.3f}s  "
+        f"first chunk {'-' if first_chunk is None else f'{first_chunk:.3f}s':>8}  "
+        f"cpu {case['cpu_seconds_per_run']:>6.3f}s/run  "
+        f"errors {case['errors']}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    available = create_backends()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=list(available),
+        default=list(available)
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=Path, help="結果をJSONで保存するパス")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(
+        run({name: available[name] for name in args.backends}, args.repeat)
+    )
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0 if all(case["runs"] for case in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
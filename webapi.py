@@ -1,10 +1,19 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import base64
+import binascii
+import hashlib
+import queue
 import sqlite3
-from typing import Final, Optional, List, Dict, Any
-from pydantic import BaseModel, Field
-from datetime import datetime
+import threading
+import time
+from typing import AsyncIterator, Final, Optional, List, Dict, Any, Tuple
+from pydantic import BaseModel, Field, TypeAdapter
+from datetime import datetime, timedelta
 import logging
 from pathlib import Path
 import json
@@ -14,6 +23,22 @@ import uvicorn
 APP_TITLE: Final[str] = "Server Board API"
 HOST: Final[str] = "localhost"
 PORT: Final[int] = 8000
+DB_POOL_SIZE: Final[int] = 4
+DB_BUSY_TIMEOUT: Final[float] = 5.0  # seconds, Botの書き込み中に待つ時間
+# 一覧のレスポンスを使い回す間隔(経過時間の表示はこの間隔で更新される)
+SNAPSHOT_INTERVAL: Final[int] = 60  # seconds
+SNAPSHOT_CACHE_SIZE: Final[int] = 64  # ページ・絞り込みの組み合わせごと
+MAX_PAGE_SIZE: Final[int] = 100
+MAX_UPPED_WITHIN_HOURS: Final[int] = 24 * 30
+MAX_SEARCH_QUERY_LENGTH: Final[int] = 100
+# trigramトークナイザは3文字未満の語を索引から探せないので、それより短い語はLIKEで探す
+MIN_FTS_TERM_LENGTH: Final[int] = 3
+# 検索の順位付けでサーバー名の一致を説明文より重く見る
+SEARCH_WEIGHTS: Final[Tuple[float, float]] = (10.0, 1.0)
+
+# 掲示板の表示順。SQLiteではDESCのときNULLが最後になるので、
+# upしたことのないサーバーは後ろに並び、board.pyのインデックスがそのまま使える
+SERVER_ORDER: Final[str] = "ORDER BY last_up_time DESC, registered_at DESC, server_id DESC"
 
 PATHS: Final[dict] = {
     "db": Path(__file__).parent / "data/server_board.db",
@@ -34,6 +59,7 @@ ERROR_MESSAGES: Final[dict] = {
     "server_not_found": "サーバーが見つかりません",
     "user_count_not_found": "ユーザー数ファイルが見つかりません: {}",
     "db_error": "DBエラー: {}",
+    "invalid_cursor": "cursorが不正です",
     "json_error": "JSONデコードエラー: {}",
     "unexpected": "予期せぬエラー: {}"
 }
@@ -59,19 +85,58 @@ class Server(BaseModel):
     time_since_last_up: Optional[str] = Field(None, description="最終アップからの経過時間")
 
 class DatabaseManager:
-    """DB操作を管理するクラス"""
+    """DB操作を管理するクラス
 
-    def __init__(self, db_path: Path) -> None:
-        self.db_path = db_path
+    読み取り専用の接続をプールしておき、クエリはスレッドプールで実行する。
+    Bot側の書き込みはWALなので、読み取りとは互いに待たされない。
+    """
 
-    def get_connection(self) -> sqlite3.Connection:
-        if not self.db_path.exists():
-            raise HTTPException(
-                status_code=500,
-                detail=ERROR_MESSAGES["db_not_found"].format(self.db_path)
-            )
+    def __init__(self, db_path: Path, pool_size: int = DB_POOL_SIZE) -> None:
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._ready = False
+        self.has_search_index = False
+
+    def open(self) -> None:
+        """接続を開き、テーブルの存在を確認する(起動時に1回)"""
+        with self._lock:
+            if self._ready:
+                return
+            if not self.db_path.exists():
+                raise HTTPException(
+                    status_code=500,
+                    detail=ERROR_MESSAGES["db_not_found"].format(self.db_path)
+                )
 
-        conn = sqlite3.connect(self.db_path)
+            connections = [self._connect() for _ in range(self.pool_size)]
+            try:
+                self.check_table_exists(connections[0])
+                self.has_search_index = connections[0].execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='servers_fts'"
+                ).fetchone() is not None
+            except Exception:
+                for conn in connections:
+                    conn.close()
+                raise
+            for conn in connections:
+                self._pool.put(conn)
+            self._ready = True
+
+    def close(self) -> None:
+        with self._lock:
+            self._ready = False
+            while not self._pool.empty():
+                self._pool.get_nowait().close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            timeout=DB_BUSY_TIMEOUT,
+            check_same_thread=False
+        )
         conn.row_factory = sqlite3.Row
         return conn
 
@@ -87,20 +152,33 @@ class DatabaseManager:
                 detail=ERROR_MESSAGES["table_not_found"]
             )
 
-    async def get_all_servers(self) -> List[Dict[str, Any]]:
+    def _execute(self, query: str, params: tuple) -> List[sqlite3.Row]:
+        # 起動時にDBがまだなかった場合は、ここで改めて開く
+        if not self._ready:
+            self.open()
+        conn = self._pool.get()
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            self._pool.put(conn)
+
+    def _change_count(self) -> Optional[int]:
+        try:
+            rows = self._execute("SELECT change_count FROM board_meta WHERE id = 1", ())
+        except sqlite3.OperationalError:
+            # 変更カウンタを作る前のBotのDB
+            return None
+        return rows[0][0] if rows else None
+
+    async def get_change_count(self) -> Optional[int]:
+        """serversテーブルの変更回数(Bot側のトリガーで更新される)"""
+        return await run_in_threadpool(self._change_count)
+
+    async def fetch_all(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """クエリをスレッドプールで実行し、行を辞書のリストで返す"""
         try:
-            with self.get_connection() as conn:
-                self.check_table_exists(conn)
-                cursor = conn.cursor()
-
-                cursor.execute("""
-                    SELECT * FROM servers
-                    ORDER BY
-                        CASE WHEN last_up_time IS NULL THEN 0 ELSE 1 END DESC,
-                        last_up_time DESC,
-                        registered_at DESC
-                """)
-                return [dict(row) for row in cursor.fetchall()]
+            rows = await run_in_threadpool(self._execute, query, params)
+            return [dict(row) for row in rows]
 
         except sqlite3.Error as e:
             logger.error("Database error: %s", e, exc_info=True)
@@ -109,28 +187,109 @@ class DatabaseManager:
                 detail=ERROR_MESSAGES["db_error"].format(str(e))
             ) from e
 
-    async def get_server(self, server_id: int) -> Dict[str, Any]:
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT * FROM servers WHERE server_id = ?",
-                    (server_id,)
-                )
-                if server := cursor.fetchone():
-                    return dict(server)
+    async def get_servers_page(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Optional[str], str, int]] = None,
+        upped_since: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        掲示板の表示順で after の次から最大 limit 件を取得する(キーセット方式)
 
-                raise HTTPException(
-                    status_code=404,
-                    detail=ERROR_MESSAGES["server_not_found"]
-                )
+        upしたサーバーとしていないサーバーを別々に引くことで、どちらも
+        インデックス上の範囲検索になり、ページの位置に関わらず一定の速さで返せる。
 
-        except sqlite3.Error as e:
-            logger.error("Database error: %s", e, exc_info=True)
-            raise HTTPException(
-                status_code=500,
-                detail=ERROR_MESSAGES["db_error"].format(str(e))
-            ) from e
+        Parameters
+        ----------
+        after : tuple, optional
+            前のページの最後の (last_up_time, registered_at, server_id)
+        upped_since : str, optional
+            この時刻以降にupしたサーバーだけに絞り込む
+        """
+        sql_limit = -1 if limit is None else limit
+        servers: List[Dict[str, Any]] = []
+
+        if after is None or after[0] is not None:
+            conditions = ["last_up_time IS NOT NULL"]
+            params: list = []
+            if after is not None:
+                conditions.append("(last_up_time, registered_at, server_id) < (?, ?, ?)")
+                params.extend(after)
+            if upped_since is not None:
+                conditions.append("last_up_time >= ?")
+                params.append(upped_since)
+            servers = await self.fetch_all(
+                f"SELECT * FROM servers WHERE {' AND '.join(conditions)} {SERVER_ORDER} LIMIT ?",
+                (*params, sql_limit)
+            )
+
+        if upped_since is None and (limit is None or len(servers) < limit):
+            conditions = ["last_up_time IS NULL"]
+            params = []
+            if after is not None and after[0] is None:
+                conditions.append("(registered_at, server_id) < (?, ?)")
+                params.extend(after[1:])
+            servers += await self.fetch_all(
+                f"SELECT * FROM servers WHERE {' AND '.join(conditions)} {SERVER_ORDER} LIMIT ?",
+                (*params, -1 if limit is None else limit - len(servers))
+            )
+        return servers
+
+    async def search_servers(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        サーバー名と説明文を検索し、関連度の高い順に返す
+
+        空白区切りの語はすべて含むものに絞り込む。全文検索の索引がない場合や
+        短い語を含む場合は LIKE による部分一致で、掲示板の表示順に返す。
+        """
+        terms = query.split()
+        if not terms:
+            return []
+
+        if self.has_search_index and all(len(term) >= MIN_FTS_TERM_LENGTH for term in terms):
+            # 各語をFTS5の文字列リテラルにして、演算子として解釈されないようにする
+            match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            return await self.fetch_all(
+                f"""
+                SELECT servers.* FROM servers_fts
+                JOIN servers ON servers.server_id = servers_fts.rowid
+                WHERE servers_fts MATCH ?
+                ORDER BY bm25(servers_fts, {SEARCH_WEIGHTS[0]}, {SEARCH_WEIGHTS[1]}), servers.server_id
+                LIMIT ? OFFSET ?
+                """,
+                (match, limit, offset)
+            )
+
+        conditions = []
+        params: list = []
+        for term in terms:
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions.append(
+                "(server_name LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\')"
+            )
+            params.extend((pattern, pattern))
+        return await self.fetch_all(
+            f"SELECT * FROM servers WHERE {' AND '.join(conditions)} {SERVER_ORDER} LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        )
+
+    async def get_server(self, server_id: int) -> Dict[str, Any]:
+        servers = await self.fetch_all(
+            "SELECT * FROM servers WHERE server_id = ?",
+            (server_id,)
+        )
+        if servers:
+            return servers[0]
+
+        raise HTTPException(
+            status_code=404,
+            detail=ERROR_MESSAGES["server_not_found"]
+        )
 
 class TimeCalculator:
     """時間計算を行うクラス"""
@@ -187,16 +346,32 @@ class ServerBoardAPI:
     """サーバーボードAPIを管理するクラス"""
 
     def __init__(self) -> None:
-        self.app = FastAPI(title=APP_TITLE)
+        self.app = FastAPI(title=APP_TITLE, lifespan=self._lifespan)
         self.db = DatabaseManager(PATHS["db"])
         self.user_count = UserCountManager(PATHS["user_count"])
         self.time_calc = TimeCalculator()
+        self._servers_adapter = TypeAdapter(List[Server])
+        # (limit, cursor, upped_within_hours) -> ((変更回数, 時間の区切り), 本文, ETag, 次のcursor)
+        self._snapshots: "OrderedDict[tuple, Tuple[Tuple[int, int], bytes, str, Optional[str]]]" = (
+            OrderedDict()
+        )
         self._setup_middleware()
         self._setup_routes()
         logger.info("Database path: %s", PATHS['db'])
         logger.info("User count file path: %s", PATHS['user_count'])
         logger.info("Public directory path: %s", PATHS['public'])
 
+    @asynccontextmanager
+    async def _lifespan(self, _: FastAPI) -> AsyncIterator[None]:
+        """起動時にDB接続を開き、終了時に閉じる"""
+        try:
+            await run_in_threadpool(self.db.open)
+        except HTTPException as e:
+            # Botがまだテーブルを作っていなければ、最初のリクエストで再試行する
+            logger.warning("Database is not ready: %s", e.detail)
+        yield
+        self.db.close()
+
     def _setup_middleware(self) -> None:
         """ミドルウェアの設定"""
         self.app.add_middleware(
@@ -204,12 +379,15 @@ class ServerBoardAPI:
             allow_origins=["*"],
             allow_credentials=True,
             allow_methods=["*"],
-            allow_headers=["*"]
+            allow_headers=["*"],
+            expose_headers=["ETag", "X-Next-Cursor", "X-Next-Offset"]
         )
 
     def _setup_routes(self) -> None:
         """ルーティングの設定"""
-        self.app.get("/api/servers")(self.get_servers)
+        self.app.get("/api/servers", response_model=List[Server])(self.get_servers)
+        # /{server_id} より先に登録しないと "search" がサーバーIDとして扱われる
+        self.app.get("/api/servers/search", response_model=List[Server])(self.search_servers)
         self.app.get("/api/servers/{server_id}")(self.get_server)
         self.app.get("/api/users")(self.get_total_users)
         self.app.mount(
@@ -232,16 +410,155 @@ class ServerBoardAPI:
                 server["time_since_last_up"] = None
         return servers
 
-    async def get_servers(self) -> List[Server]:
-        """全サーバー情報を取得するエンドポイント"""
+    def _serialize_servers(self, servers: List[Dict[str, Any]]) -> bytes:
+        processed_servers = self._process_server_data(servers)
+        return self._servers_adapter.dump_json(
+            [Server(**server) for server in processed_servers]
+        )
+
+    @staticmethod
+    def _encode_cursor(server: Dict[str, Any]) -> str:
+        position = [server["last_up_time"], server["registered_at"], server["server_id"]]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[Optional[str], str, int]:
         try:
-            servers = await self.db.get_all_servers()
-            if not servers:
-                return []
+            position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            last_up_time, registered_at, server_id = position
+            if (
+                not isinstance(last_up_time, (str, type(None)))
+                or not isinstance(registered_at, str)
+                or not isinstance(server_id, int)
+            ):
+                raise ValueError(position)
+        except (binascii.Error, ValueError, TypeError) as e:
+            raise HTTPException(
+                status_code=400,
+                detail=ERROR_MESSAGES["invalid_cursor"]
+            ) from e
+        return last_up_time, registered_at, server_id
 
-            processed_servers = self._process_server_data(servers)
-            return [Server(**server) for server in processed_servers]
+    async def _get_servers_snapshot(
+        self,
+        limit: Optional[int],
+        cursor: Optional[str],
+        upped_within_hours: Optional[int]
+    ) -> Tuple[bytes, str, Optional[str]]:
+        """一覧のJSON・ETag・次のcursor(DBが変わらず同じ時間の区切りの間は使い回す)"""
+        after = self._decode_cursor(cursor) if cursor else None
+        params = (limit, cursor, upped_within_hours)
+        change_count = await self.db.get_change_count()
+        bucket = int(time.time() // SNAPSHOT_INTERVAL)
+        key = (change_count, bucket)
+        if change_count is not None and (snapshot := self._snapshots.get(params)):
+            if snapshot[0] == key:
+                self._snapshots.move_to_end(params)
+                return snapshot[1], snapshot[2], snapshot[3]
+
+        upped_since = None
+        if upped_within_hours is not None:
+            # 同じ区切りの間は同じ結果になるよう、区切りの時刻を基準にする
+            since = datetime.fromtimestamp(bucket * SNAPSHOT_INTERVAL)
+            upped_since = (since - timedelta(hours=upped_within_hours)).isoformat()
+
+        # 次のページがあるかを知るため1件多く取得する
+        servers = await self.db.get_servers_page(
+            None if limit is None else limit + 1, after, upped_since
+        )
+        next_cursor = None
+        if limit is not None and len(servers) > limit:
+            servers = servers[:limit]
+            next_cursor = self._encode_cursor(servers[-1])
+
+        body = await run_in_threadpool(self._serialize_servers, servers)
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        if change_count is not None:
+            self._snapshots[params] = (key, body, etag, next_cursor)
+            self._snapshots.move_to_end(params)
+            while len(self._snapshots) > SNAPSHOT_CACHE_SIZE:
+                self._snapshots.popitem(last=False)
+        return body, etag, next_cursor
 
+    @staticmethod
+    def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    async def get_servers(
+        self,
+        request: Request,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        upped_within_hours: Optional[int] = Query(None, ge=1, le=MAX_UPPED_WITHIN_HOURS)
+    ) -> Response:
+        """
+        サーバー情報を掲示板の表示順で取得するエンドポイント
+
+        Parameters
+        ----------
+        limit : int, optional
+            1ページの件数。省略すると全件を返す
+        cursor : str, optional
+            前のページの X-Next-Cursor ヘッダーの値
+        upped_within_hours : int, optional
+            指定した時間以内にupしたサーバーだけを返す
+        """
+        try:
+            body, etag, next_cursor = await self._get_servers_snapshot(
+                limit, cursor, upped_within_hours
+            )
+
+        except HTTPException:
+            raise
+
+        except Exception as e:
+            logger.error("Unexpected error: %s", e, exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail=ERROR_MESSAGES["unexpected"].format(str(e))
+            ) from e
+
+        # 毎回検証させ、変わっていなければ本文なしの304を返す
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        if self._etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def search_servers(
+        self,
+        q: str = Query(..., min_length=1, max_length=MAX_SEARCH_QUERY_LENGTH),
+        limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+        offset: int = Query(0, ge=0)
+    ) -> Response:
+        """
+        サーバー名と説明文を検索するエンドポイント
+
+        Parameters
+        ----------
+        q : str
+            検索語(空白区切りで絞り込み)
+        limit : int
+            1ページの件数
+        offset : int
+            前のページの X-Next-Offset ヘッダーの値
+        """
+        try:
+            # 次のページがあるかを知るため1件多く取得する
+            servers = await self.db.search_servers(q, limit + 1, offset)
+            headers = {}
+            if len(servers) > limit:
+                servers = servers[:limit]
+                headers["X-Next-Offset"] = str(offset + limit)
+            body = await run_in_threadpool(self._serialize_servers, servers)
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error("Unexpected error: %s", e, exc_info=True)
             raise HTTPException(